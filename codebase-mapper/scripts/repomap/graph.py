@@ -0,0 +1,224 @@
+"""
+Incremental file reference graph for RepoMap.
+"""
+
+import uuid
+from array import array
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# CSR form: (node names, row pointers, column indices, edge weights)
+CSR = Tuple[List[str], array, array, array]
+
+
+class ReferenceGraph:
+    """Weighted file graph: edge u -> v counts the names u references that v defines.
+
+    Each file's definitions and references are remembered along with the
+    mtime they were read at, so a rebuild only patches the edges of files
+    whose tags changed. Multi-edges are collapsed into integer weights and
+    node ids are stable integers; the CSR arrays used for ranking are
+    rebuilt only after a change.
+    """
+
+    def __init__(self):
+        self.node_ids: Dict[str, int] = {}
+        self.nodes: List[Optional[str]] = []
+        self.free: List[int] = []
+        self.mtimes: Dict[int, Optional[float]] = {}
+        self.defs: Dict[int, frozenset] = {}
+        self.refs: Dict[int, frozenset] = {}
+        self.defines = defaultdict(set)      # name -> ids of files defining it
+        self.references = defaultdict(set)   # name -> ids of files referencing it
+        self.out = defaultdict(Counter)      # id -> {id: weight}
+        self.uid = uuid.uuid4().hex
+        self.revision = 0
+        self.dirty = False
+        self._csr: Optional[CSR] = None
+
+    def __len__(self) -> int:
+        return len(self.node_ids)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["dirty"] = False
+        state["_csr"] = None
+        return state
+
+    def is_current(self, rel_fname: str, mtime: Optional[float]) -> bool:
+        """True if rel_fname is in the graph with tags read at mtime."""
+        node = self.node_ids.get(rel_fname)
+        return node is not None and self.mtimes[node] == mtime
+
+    def update(
+        self,
+        rel_fname: str,
+        mtime: Optional[float],
+        defs: Iterable[str],
+        refs: Iterable[str],
+    ) -> None:
+        """Replace a file's definitions and references, patching its edges."""
+        node = self.node_ids.get(rel_fname)
+        if node is None:
+            node = self._add_node(rel_fname)
+        else:
+            self._unlink(node)
+
+        defs, refs = frozenset(defs), frozenset(refs)
+        self.mtimes[node] = mtime
+        self.defs[node] = defs
+        self.refs[node] = refs
+        for name in defs:
+            self.defines[name].add(node)
+        for name in refs:
+            self.references[name].add(node)
+        self._link(node, 1)
+        self._changed()
+
+    def retain(self, rel_fnames: Set[str]) -> None:
+        """Drop every file not in rel_fnames."""
+        for rel_fname in [f for f in self.node_ids if f not in rel_fnames]:
+            node = self.node_ids.pop(rel_fname)
+            self._unlink(node)
+            del self.mtimes[node], self.defs[node], self.refs[node]
+            self.out.pop(node, None)
+            self.nodes[node] = None
+            self.free.append(node)
+            self._changed()
+
+    def csr(self) -> CSR:
+        """Return the graph as (names, indptr, indices, weights) over live nodes."""
+        if self._csr is None:
+            live = [node for node, name in enumerate(self.nodes) if name is not None]
+            dense = {node: i for i, node in enumerate(live)}
+            indptr, indices, weights = array("l", [0]), array("l"), array("d")
+            for node in live:
+                for target, weight in self.out.get(node, {}).items():
+                    indices.append(dense[target])
+                    weights.append(weight)
+                indptr.append(len(indices))
+            self._csr = ([self.nodes[node] for node in live], indptr, indices, weights)
+        return self._csr
+
+    def _add_node(self, rel_fname: str) -> int:
+        if self.free:
+            node = self.free.pop()
+            self.nodes[node] = rel_fname
+        else:
+            node = len(self.nodes)
+            self.nodes.append(rel_fname)
+        self.node_ids[rel_fname] = node
+        return node
+
+    def _link(self, node: int, delta: int) -> None:
+        """Add (delta=1) or remove (delta=-1) every edge touching node."""
+        for name in self.refs[node]:
+            for target in self.defines.get(name, ()):
+                if target != node:
+                    self._bump(node, target, delta)
+        for name in self.defs[node]:
+            for source in self.references.get(name, ()):
+                if source != node:
+                    self._bump(source, node, delta)
+
+    def _unlink(self, node: int) -> None:
+        """Remove a file's edges and symbol memberships."""
+        self._link(node, -1)
+        for name in self.defs[node]:
+            self._discard(self.defines, name, node)
+        for name in self.refs[node]:
+            self._discard(self.references, name, node)
+
+    def _bump(self, source: int, target: int, delta: int) -> None:
+        edges = self.out[source]
+        edges[target] += delta
+        if not edges[target]:
+            del edges[target]
+            if not edges:
+                del self.out[source]
+
+    @staticmethod
+    def _discard(index, name: str, node: int) -> None:
+        nodes = index[name]
+        nodes.discard(node)
+        if not nodes:
+            del index[name]
+
+    def _changed(self) -> None:
+        self.revision += 1
+        self.dirty = True
+        self._csr = None
+
+
+def pagerank(
+    csr: CSR,
+    teleport: Sequence[float],
+    start: Optional[Sequence[float]] = None,
+    alpha: float = 0.85,
+    max_iter: int = 100,
+    tol: float = 1e-6,
+) -> List[float]:
+    """Weighted PageRank by power iteration; returns scores summing to 1.
+
+    Each node passes its score along its out-edges in proportion to their
+    weights. Dangling nodes redistribute along teleport. start (for example
+    the previous run's scores) is the initial vector, defaulting to
+    teleport. Uses NumPy when installed, pure Python otherwise.
+    """
+    _, indptr, indices, weights = csr
+    scores = list(start) if start is not None else list(teleport)
+    iterate = _iterate_numpy if np is not None else _iterate_python
+    return iterate(indptr, indices, weights, list(teleport), scores, alpha, max_iter, tol)
+
+
+def _iterate_python(indptr, indices, weights, teleport, scores, alpha, max_iter, tol):
+    n = len(teleport)
+    out_weight = [sum(weights[indptr[i]:indptr[i + 1]]) for i in range(n)]
+    dangling = [i for i in range(n) if out_weight[i] == 0]
+
+    for _ in range(max_iter):
+        new_scores = [0.0] * n
+        dangling_sum = sum(scores[i] for i in dangling)
+
+        for i in range(n):
+            if out_weight[i] > 0:
+                share = scores[i] / out_weight[i]
+                for k in range(indptr[i], indptr[i + 1]):
+                    new_scores[indices[k]] += share * weights[k]
+
+        for i in range(n):
+            new_scores[i] = alpha * (new_scores[i] + dangling_sum * teleport[i]) + (1 - alpha) * teleport[i]
+
+        # Check convergence
+        diff = sum(abs(new_scores[i] - scores[i]) for i in range(n))
+        scores = new_scores
+        if diff < tol:
+            break
+    return scores
+
+
+def _iterate_numpy(indptr, indices, weights, teleport, scores, alpha, max_iter, tol):
+    n = len(teleport)
+    cols = np.asarray(indices, dtype=np.int64)
+    edge_weights = np.asarray(weights, dtype=np.float64)
+    rows = np.repeat(np.arange(n), np.diff(np.asarray(indptr, dtype=np.int64)))
+    out_weight = np.bincount(rows, weights=edge_weights, minlength=n)
+    dangling = out_weight == 0
+    inv_out = np.divide(1.0, out_weight, out=np.zeros(n), where=~dangling)
+    teleport = np.asarray(teleport, dtype=np.float64)
+    x = np.asarray(scores, dtype=np.float64)
+
+    for _ in range(max_iter):
+        # Sparse transpose product: scatter each edge's share onto its target
+        flow = np.bincount(cols, weights=(x * inv_out)[rows] * edge_weights, minlength=n)
+        new = alpha * (flow + x[dangling].sum() * teleport) + (1 - alpha) * teleport
+        diff = np.abs(new - x).sum()
+        x = new
+        if diff < tol:
+            break
+    return x.tolist()
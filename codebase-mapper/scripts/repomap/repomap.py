@@ -9,11 +9,13 @@ Uses Tree-sitter for parsing and PageRank for ranking importance.
 
 import argparse
 import os
+import subprocess
 import sys
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional, Set
 
-from utils import count_tokens, read_text, Tag
+from utils import count_tokens, count_tokens_many, read_text, Tag
 from scm import get_scm_fname
 from importance import is_important, filter_important_files
 from repomap_class import RepoMap
@@ -25,20 +27,130 @@ DEFAULT_EXCLUDE_DIRS = {
 }
 
 
-def find_git_files(directory: str) -> set:
-    """Get set of files tracked by git (respects .gitignore)."""
-    import subprocess
+FILE_LIST_CACHE_PREFIX = "__files_v1__"
+SCAN_THREADS = 8
+
+
+def git_ls_files(directory: str) -> Optional[List[str]]:
+    """List files under directory known to git (respects .gitignore), relative to it."""
+    try:
+        result = subprocess.run(
+            ['git', 'ls-files', '-z', '--cached', '--others', '--exclude-standard'],
+            capture_output=True, text=True, cwd=directory,
+        )
+    except FileNotFoundError:
+        return None
+    if result.returncode != 0:
+        return None
+    return [f for f in result.stdout.split('\0') if f]
+
+
+def _skipped_dir(parts: List[str], skip_dirs) -> bool:
+    return any(p.startswith('.') or p in skip_dirs for p in parts)
+
+
+def _git_stamp_paths(
+    directory: str, rel_files: List[str], exclude_extensions, skip_dirs
+) -> Set[str]:
+    """Paths whose mtimes change when the git listing of directory can change.
+
+    Every directory the walk would visit is included, not only those holding
+    listed files, so a new file next to ignored ones is still noticed.
+    """
+    paths: Set[str] = set()
+    walk_src_files(directory, exclude_extensions, skip_dirs, paths)
+    for rel in rel_files:
+        parts = rel.split('/')
+        if parts[-1] == '.gitignore' and not _skipped_dir(parts[:-1], skip_dirs):
+            paths.add(os.path.join(directory, *parts))
     try:
         result = subprocess.run(
-            ['git', 'ls-files', '--cached', '--others', '--exclude-standard'],
+            ['git', 'rev-parse', '--absolute-git-dir'],
             capture_output=True, text=True, cwd=directory,
         )
         if result.returncode == 0:
-            abs_dir = os.path.abspath(directory)
-            return {os.path.join(abs_dir, f) for f in result.stdout.splitlines() if f}
+            git_dir = result.stdout.strip()
+            paths.add(os.path.join(git_dir, 'index'))
+            paths.add(os.path.join(git_dir, 'info', 'exclude'))
     except FileNotFoundError:
         pass
-    return set()
+    return paths
+
+
+def select_git_files(
+    directory: str, rel_files: List[str], exclude_extensions, skip_dirs
+) -> List[str]:
+    """Filter a git listing the way the directory walk filters files."""
+    src_files = []
+    for rel in rel_files:
+        parts = rel.split('/')
+        if _skipped_dir(parts[:-1], skip_dirs):
+            continue
+        if parts[-1].startswith('.'):
+            continue
+        _, ext = os.path.splitext(parts[-1])
+        if ext in exclude_extensions:
+            continue
+        full_path = os.path.join(directory, *parts)
+        # Deleted-but-tracked files, directory symlinks and submodules
+        if os.path.isfile(full_path):
+            src_files.append(full_path)
+    return src_files
+
+
+def walk_src_files(
+    directory: str, exclude_extensions, skip_dirs, stamps: Optional[Set[str]] = None
+) -> List[str]:
+    """Walk directory with os.scandir, scanning subdirectories in a thread pool.
+
+    Skips hidden entries and skip_dirs and does not follow directory
+    symlinks, like os.walk. Scanned directories are added to stamps.
+    """
+    def scan(path):
+        files, subdirs = [], []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    name = entry.name
+                    if name.startswith('.'):
+                        continue
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if is_dir:
+                        if name not in skip_dirs and not entry.is_symlink():
+                            subdirs.append(entry.path)
+                        continue
+                    _, ext = os.path.splitext(name)
+                    if ext not in exclude_extensions:
+                        files.append(entry.path)
+        except OSError:
+            pass
+        return path, files, subdirs
+
+    src_files = []
+    with ThreadPoolExecutor(max_workers=SCAN_THREADS) as pool:
+        pending = {pool.submit(scan, directory)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path, files, subdirs = future.result()
+                if stamps is not None:
+                    stamps.add(path)
+                src_files.extend(files)
+                pending.update(pool.submit(scan, d) for d in subdirs)
+    return src_files
+
+
+def _mtimes(paths) -> Dict[str, Optional[int]]:
+    stamps = {}
+    for path in paths:
+        try:
+            stamps[path] = os.stat(path).st_mtime_ns
+        except OSError:
+            stamps[path] = None
+    return stamps
 
 
 def find_src_files(
@@ -46,8 +158,15 @@ def find_src_files(
     exclude_extensions: List[str] = None,
     exclude_dirs: List[str] = None,
     respect_gitignore: bool = True,
+    cache=None,
 ) -> List[str]:
-    """Find source files in a directory."""
+    """Find source files in a directory.
+
+    Uses the git listing when directory is in a git repository, otherwise
+    walks the tree. With a cache (mapping), the result is stored along with
+    the mtimes of the directories (and git index / .gitignore files) it
+    came from and reused while none of them changed.
+    """
     if not os.path.isdir(directory):
         if os.path.isfile(directory):
             if exclude_extensions:
@@ -57,30 +176,39 @@ def find_src_files(
             return [directory]
         return []
 
-    exclude_extensions = exclude_extensions or []
+    exclude_extensions = set(exclude_extensions or [])
     skip_dirs = DEFAULT_EXCLUDE_DIRS | set(exclude_dirs or [])
 
-    # Try git ls-files for .gitignore awareness
-    git_files = find_git_files(directory) if respect_gitignore else set()
-    use_git = bool(git_files)
-
-    src_files = []
-    for root, dirs, files in os.walk(directory):
-        dirs[:] = [
-            d for d in dirs
-            if not d.startswith('.') and d not in skip_dirs
-        ]
-        for file in files:
-            if file.startswith('.'):
-                continue
-            _, ext = os.path.splitext(file)
-            if ext in exclude_extensions:
-                continue
-            full_path = os.path.join(root, file)
-            if use_git and os.path.abspath(full_path) not in git_files:
-                continue
-            src_files.append(full_path)
+    cache_key = None
+    if cache is not None:
+        cache_key = FILE_LIST_CACHE_PREFIX + repr((
+            os.path.abspath(directory), directory, sorted(exclude_extensions),
+            sorted(skip_dirs), respect_gitignore,
+        ))
+        try:
+            entry = cache.get(cache_key)
+        except Exception:
+            entry = None
+        if entry and _mtimes(entry["stamps"]) == entry["stamps"]:
+            return list(entry["files"])
 
+    # Try git ls-files for .gitignore awareness
+    git_files = git_ls_files(directory) if respect_gitignore else None
+    if git_files:
+        src_files = select_git_files(directory, git_files, exclude_extensions, skip_dirs)
+        stamp_paths = (
+            _git_stamp_paths(directory, git_files, exclude_extensions, skip_dirs)
+            if cache_key else None
+        )
+    else:
+        stamp_paths = set() if cache_key else None
+        src_files = walk_src_files(directory, exclude_extensions, skip_dirs, stamp_paths)
+
+    if cache_key:
+        try:
+            cache[cache_key] = {"stamps": _mtimes(stamp_paths), "files": src_files}
+        except Exception:
+            pass
     return src_files
 
 
@@ -177,7 +305,7 @@ Examples:
     parser.add_argument(
         "--force-refresh",
         action="store_true",
-        help="Force refresh of caches"
+        help="Rebuild the map and file list instead of reusing cached ones"
     )
 
     parser.add_argument(
@@ -204,11 +332,27 @@ Examples:
         help="Include files ignored by .gitignore (default: respect .gitignore)"
     )
 
+    parser.add_argument(
+        "--cache-file-list",
+        action="store_true",
+        help="Reuse the discovered file list while no directory mtime changed"
+    )
+
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=0,
+        help="Parse uncached files in N processes (default: 0 = all cores)"
+    )
+
     args = parser.parse_args()
     
     # Set up token counter with specified model
     def token_counter(text: str) -> int:
         return count_tokens(text, args.model)
+
+    def token_counter_many(texts: List[str]) -> List[int]:
+        return count_tokens_many(texts, args.model)
     
     # Set up output handlers
     output_handlers = {
@@ -227,18 +371,38 @@ Examples:
     elif args.paths:
         context_paths.extend(args.paths)
 
+    root_path = Path(args.root).resolve()
+
+    # Create RepoMap instance
+    repo_map = RepoMap(
+        map_tokens=args.map_tokens,
+        root=str(root_path),
+        token_counter_func=token_counter,
+        token_counter_many_func=token_counter_many,
+        file_reader_func=read_text,
+        output_handler_funcs=output_handlers,
+        verbose=args.verbose,
+        max_context_window=args.max_context_window,
+        exclude_unranked=args.exclude_unranked,
+        jobs=args.jobs,
+        map_cache_tag=args.model
+    )
+
     # Expand directories into file lists
     exclude_exts = args.exclude_extensions or []
     exclude_dirs = args.exclude_dirs or []
+    file_list_cache = None
+    if args.cache_file_list and not args.force_refresh:
+        file_list_cache = repo_map.TAGS_CACHE
     expanded_context_files = []
     for path_spec in context_paths:
         expanded_context_files.extend(find_src_files(
             path_spec, exclude_exts, exclude_dirs,
             respect_gitignore=not args.no_gitignore,
+            cache=file_list_cache,
         ))
 
     # Convert to absolute paths
-    root_path = Path(args.root).resolve()
     focus_files = [str(Path(f).resolve()) for f in focus_files_from_args]
     context_files = [str(Path(f).resolve()) for f in expanded_context_files]
 
@@ -246,18 +410,6 @@ Examples:
     mentioned_fnames = set(args.mentioned_files) if args.mentioned_files else None
     mentioned_idents = set(args.mentioned_idents) if args.mentioned_idents else None
 
-    # Create RepoMap instance
-    repo_map = RepoMap(
-        map_tokens=args.map_tokens,
-        root=str(root_path),
-        token_counter_func=token_counter,
-        file_reader_func=read_text,
-        output_handler_funcs=output_handlers,
-        verbose=args.verbose,
-        max_context_window=args.max_context_window,
-        exclude_unranked=args.exclude_unranked
-    )
-
     # Generate the map
     try:
         map_content = repo_map.get_repo_map(
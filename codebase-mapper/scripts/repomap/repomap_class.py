@@ -2,21 +2,20 @@
 RepoMap class for generating repository maps.
 """
 
+import hashlib
 import os
 import sys
 from pathlib import Path
 from collections import namedtuple, defaultdict
+from functools import lru_cache
 from typing import List, Dict, Set, Optional, Tuple, Callable, Any
 import shutil
 import sqlite3
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from utils import Tag
 
-try:
-    import networkx as nx
-except ImportError:
-    print("Error: networkx is required. Install with: pip install networkx")
-    sys.exit(1)
-
 try:
     import diskcache
 except ImportError:
@@ -29,18 +28,162 @@ except ImportError:
     print("Error: grep-ast is required. Install with: pip install grep-ast")
     sys.exit(1)
 
-from utils import count_tokens, read_text, Tag
-from scm import get_scm_fname
+from utils import count_tokens, count_tokens_many, read_text, Tag
+from scm import get_scm_query
 from importance import filter_important_files
+from graph import ReferenceGraph, pagerank
 
 # Constants
 CACHE_VERSION = 1
 TAGS_CACHE_DIRNAME = f".repomap.tags.cache.v{CACHE_VERSION}"
 SQLITE_ERRORS = (sqlite3.OperationalError, sqlite3.DatabaseError)
+GRAPH_CACHE_KEY = "__reference_graph__"
+RANKS_CACHE_KEY = "__pagerank__"
+MAP_CACHE_PREFIX = "__map_v1__"
+
+# Below this many uncached files a process pool costs more than it saves
+PARALLEL_MIN_FILES = 32
 
 # Tag namedtuple for storing parsed code definitions and references
 Tag = namedtuple("Tag", "rel_fname fname line name kind".split())
 
+# Tree-sitter parsers and compiled queries are built once per language in
+# each process (including pool workers), so per-file work is just the parse
+
+
+@lru_cache(maxsize=None)
+def _get_parser(lang: str):
+    """Return (language, parser) for lang."""
+    from grep_ast.tsl import get_language, get_parser
+    return get_language(lang), get_parser(lang)
+
+
+@lru_cache(maxsize=None)
+def _get_query(lang: str):
+    """Return the compiled tags query for lang, or None if it has none."""
+    query_text = get_scm_query(lang)
+    if not query_text:
+        return None
+    language, _ = _get_parser(lang)
+    return language.query(query_text)
+
+
+def _query_captures(query, tree) -> Dict[str, list]:
+    """Run a compiled tags query over a parsed tree."""
+    # tree-sitter 0.25+ moved captures to QueryCursor
+    try:
+        return query.captures(tree.root_node)
+    except AttributeError:
+        import tree_sitter
+        cursor = tree_sitter.QueryCursor(query)
+        return cursor.captures(tree.root_node)
+
+
+def _captures_to_tags(captures, fname: str, rel_fname: str, line_offset: int = 0) -> List[Tag]:
+    """Convert definition/reference captures to tags."""
+    tags = []
+    for capture_name, nodes in captures.items():
+        if capture_name.startswith("name.definition"):
+            kind = "def"
+        elif capture_name.startswith("name.reference"):
+            kind = "ref"
+        else:
+            continue
+
+        for node in nodes:
+            tags.append(Tag(
+                rel_fname=rel_fname,
+                fname=fname,
+                line=node.start_point[0] + 1 + line_offset,
+                name=node.text.decode("utf-8"),
+                kind=kind,
+            ))
+    return tags
+
+
+def extract_tags(
+    fname: str,
+    rel_fname: str,
+    file_reader_func: Callable[[str], Optional[str]] = read_text,
+    on_error: Callable[[str], Any] = print,
+) -> List[Tag]:
+    """Parse a file with Tree-sitter and return its definition/reference tags."""
+    try:
+        from grep_ast import filename_to_lang
+    except ImportError:
+        print("Error: grep-ast is required. Install with: pip install grep-ast")
+        sys.exit(1)
+
+    lang = filename_to_lang(fname)
+    if not lang:
+        return []
+
+    code = file_reader_func(fname)
+    if not code:
+        return []
+
+    # Svelte/Vue: extract <script> block and parse as TypeScript
+    if lang in ("svelte", "vue"):
+        return _extract_script_block_tags(fname, rel_fname, code, on_error)
+
+    try:
+        _, parser = _get_parser(lang)
+    except Exception as err:
+        on_error(f"Skipping file {fname}: {err}")
+        return []
+
+    try:
+        query = _get_query(lang)
+        if query is None:
+            return []
+
+        tree = parser.parse(bytes(code, "utf-8"))
+        captures = _query_captures(query, tree)
+        return _captures_to_tags(captures, fname, rel_fname)
+
+    except Exception as e:
+        on_error(f"Error parsing {fname}: {e}")
+        return []
+
+
+def _extract_script_block_tags(fname, rel_fname, code, on_error) -> List[Tag]:
+    """Extract <script> content from Svelte/Vue files and parse as TypeScript."""
+    import re
+    pattern = re.compile(r'<script[^>]*>(.*?)</script>', re.DOTALL)
+    matches = list(pattern.finditer(code))
+    if not matches:
+        return []
+
+    try:
+        _, ts_parser = _get_parser("typescript")
+        ts_query = _get_query("typescript")
+    except Exception:
+        return []
+    if ts_query is None:
+        return []
+
+    all_tags = []
+    for match in matches:
+        script_code = match.group(1)
+        line_offset = code[: match.start(1)].count("\n")
+
+        try:
+            tree = ts_parser.parse(bytes(script_code, "utf-8"))
+            captures = _query_captures(ts_query, tree)
+            all_tags.extend(_captures_to_tags(captures, fname, rel_fname, line_offset))
+        except Exception as e:
+            on_error(f"Error parsing script block in {fname}: {e}")
+
+    return all_tags
+
+
+def _extract_tags_worker(item: Tuple[str, str, float]):
+    """Process-pool entry point: parse one file, returning its tags and errors."""
+    fname, rel_fname, file_mtime = item
+    errors = []
+    tags = extract_tags(fname, rel_fname, read_text, errors.append)
+    return fname, file_mtime, tags, errors
+
 
 class RepoMap:
     """Main class for generating repository maps."""
@@ -57,13 +200,22 @@ class RepoMap:
         max_context_window: Optional[int] = None,
         map_mul_no_files: int = 8,
         refresh: str = "auto",
-        exclude_unranked: bool = False
+        exclude_unranked: bool = False,
+        jobs: int = 0,
+        token_counter_many_func: Optional[Callable[[List[str]], List[int]]] = None,
+        map_cache_tag: Any = None
     ):
         """Initialize RepoMap instance."""
         self.map_tokens = map_tokens
         self.max_map_tokens = map_tokens
         self.root = Path(root or os.getcwd()).resolve()
         self.token_count_func_internal = token_counter_func
+        if token_counter_many_func is None:
+            if token_counter_func is count_tokens:
+                token_counter_many_func = count_tokens_many
+            else:
+                token_counter_many_func = lambda texts: [token_counter_func(t) for t in texts]
+        self.token_count_many_func_internal = token_counter_many_func
         self.read_text_func_internal = file_reader_func
         self.repo_content_prefix = repo_content_prefix
         self.verbose = verbose
@@ -71,6 +223,8 @@ class RepoMap:
         self.map_mul_no_files = map_mul_no_files
         self.refresh = refresh
         self.exclude_unranked = exclude_unranked
+        self.jobs = jobs
+        self.map_cache_tag = map_cache_tag
         
         # Set up output handlers
         if output_handler_funcs is None:
@@ -86,6 +240,7 @@ class RepoMap:
         self.tree_context_cache = {}
         self.map_cache = {}
         self.ranked_file_count = 0
+        self.graph = None
         
         # Load persistent tags cache
         self.load_tags_cache()
@@ -119,9 +274,24 @@ class RepoMap:
         if not text:
             return 0
         
-        len_text = len(text)
-        if len_text < 200:
-            return self.token_count_func_internal(text)
+        sample_text = self._token_sample(text)
+        sample_tokens = self.token_count_func_internal(sample_text)
+        return self._scale_sample_tokens(text, sample_text, sample_tokens)
+    
+    def token_count_many(self, texts: List[str]) -> List[int]:
+        """Count tokens in many texts with one batched call to the counter."""
+        samples = [self._token_sample(text) if text else "" for text in texts]
+        counts = self.token_count_many_func_internal(samples)
+        return [
+            self._scale_sample_tokens(text, sample, tokens) if text else 0
+            for text, sample, tokens in zip(texts, samples, counts)
+        ]
+    
+    @staticmethod
+    def _token_sample(text: str) -> str:
+        """Return the text to tokenize for an estimate: short texts whole, long ones sampled."""
+        if len(text) < 200:
+            return text
         
         # Sample for longer texts
         lines = text.splitlines(keepends=True)
@@ -129,17 +299,14 @@ class RepoMap:
         
         step = max(1, num_lines // 100)
         sampled_lines = lines[::step]
-        sample_text = "".join(sampled_lines)
-        
-        if not sample_text:
-            return self.token_count_func_internal(text)
-        
-        sample_tokens = self.token_count_func_internal(sample_text)
-        
-        if len(sample_text) == 0:
-            return self.token_count_func_internal(text)
-        
-        est_tokens = (sample_tokens / len(sample_text)) * len_text
+        return "".join(sampled_lines) or text
+    
+    @staticmethod
+    def _scale_sample_tokens(text: str, sample_text: str, sample_tokens: int) -> int:
+        """Scale a sample's token count up to the length of the full text."""
+        if sample_text is text:
+            return sample_tokens
+        est_tokens = (sample_tokens / len(sample_text)) * len(text)
         return int(est_tokens)
     
     def get_rel_fname(self, fname: str) -> str:
@@ -157,202 +324,155 @@ class RepoMap:
             self.output_handlers['warning'](f"File not found: {fname}")
             return None
     
-    def get_tags(self, fname: str, rel_fname: str) -> List[Tag]:
+    def get_tags(
+        self, fname: str, rel_fname: str, file_mtime: Optional[float] = None
+    ) -> List[Tag]:
         """Get tags for a file, using cache when possible."""
-        file_mtime = self.get_mtime(fname)
+        if file_mtime is None:
+            file_mtime = self.get_mtime(fname)
         if file_mtime is None:
             return []
         
+        tags = self._cached_tags(fname, file_mtime)
+        if tags is not None:
+            return tags
+        
+        # Cache miss or file changed
+        tags = self.get_tags_raw(fname, rel_fname)
+        self._store_tags(fname, file_mtime, tags)
+        return tags
+
+    def _cached_tags(self, fname: str, file_mtime: float) -> Optional[List[Tag]]:
+        """Return cached tags for fname if they match file_mtime."""
         try:
             cached_entry = self.TAGS_CACHE.get(fname)
             if cached_entry and cached_entry.get("mtime") == file_mtime:
                 return cached_entry["data"]
         except SQLITE_ERRORS:
             self.tags_cache_error()
-        
-        # Cache miss or file changed
-        tags = self.get_tags_raw(fname, rel_fname)
-        
+        return None
+
+    def _store_tags(self, fname: str, file_mtime: float, tags: List[Tag]) -> None:
+        """Write tags for fname to the persistent cache."""
         try:
             self.TAGS_CACHE[fname] = {"mtime": file_mtime, "data": tags}
         except SQLITE_ERRORS:
             self.tags_cache_error()
-        
-        return tags
     
     def get_tags_raw(self, fname: str, rel_fname: str) -> List[Tag]:
         """Parse file to extract tags using Tree-sitter."""
-        try:
-            from grep_ast import filename_to_lang
-            from grep_ast.tsl import get_language, get_parser
-        except ImportError:
-            print("Error: grep-ast is required. Install with: pip install grep-ast")
-            sys.exit(1)
-            
-        lang = filename_to_lang(fname)
-        if not lang:
-            return []
-
-        code = self.read_text_func_internal(fname)
-        if not code:
-            return []
+        return extract_tags(
+            fname, rel_fname, self.read_text_func_internal, self.output_handlers['error']
+        )
 
-        # Svelte/Vue: extract <script> block and parse as TypeScript
-        if lang in ("svelte", "vue"):
-            return self._get_tags_from_script_block(fname, rel_fname, code, get_language, get_parser)
+    def prefetch_tags(self, files: List[Tuple[str, str, float]]) -> Dict[str, List[Tag]]:
+        """Load tags for (fname, rel_fname, mtime) files, parsing misses in a process pool.
+
+        Returns the tags read from the cache or parsed, keyed by fname; files
+        left out (serial parsing, or a failed pool) are parsed by get_tags().
+        """
+        loaded = {}
+        misses = []
+        for item in files:
+            tags = self._cached_tags(item[0], item[2])
+            if tags is None:
+                misses.append(item)
+            else:
+                loaded[item[0]] = tags
 
-        try:
-            language = get_language(lang)
-            parser = get_parser(lang)
-        except Exception as err:
-            self.output_handlers['error'](f"Skipping file {fname}: {err}")
-            return []
+        jobs = self.jobs or os.cpu_count() or 1
+        # Workers read files themselves, so a custom reader keeps parsing serial
+        if jobs < 2 or self.read_text_func_internal is not read_text:
+            return loaded
+        if len(misses) < PARALLEL_MIN_FILES:
+            return loaded
 
-        scm_fname = get_scm_fname(lang)
-        if not scm_fname:
-            return []
-        
+        jobs = min(jobs, len(misses))
+        chunksize = max(1, len(misses) // (jobs * 8))
         try:
-            tree = parser.parse(bytes(code, "utf-8"))
-            
-            # Load query from SCM file
-            query_text = read_text(scm_fname, silent=True)
-            if not query_text:
-                return []
-            
-            query = language.query(query_text)
-
-            # tree-sitter 0.25+ moved captures to QueryCursor
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                for fname, file_mtime, tags, errors in pool.map(
+                    _extract_tags_worker, misses, chunksize=chunksize
+                ):
+                    for message in errors:
+                        self.output_handlers['error'](message)
+                    self._store_tags(fname, file_mtime, tags)
+                    loaded[fname] = tags
+        except (OSError, BrokenProcessPool) as e:
+            # Anything not loaded yet is parsed serially by get_tags()
+            self.output_handlers['warning'](f"Parallel tag extraction failed: {e}")
+        return loaded
+
+    def load_graph(self) -> ReferenceGraph:
+        """Load the persistent reference graph, or start an empty one."""
+        if self.graph is None:
             try:
-                captures = query.captures(tree.root_node)
-            except AttributeError:
-                import tree_sitter
-                cursor = tree_sitter.QueryCursor(query)
-                captures = cursor.captures(tree.root_node)
-
-            tags = []
-            for capture_name, nodes in captures.items():
-                for node in nodes:
-                    if capture_name.startswith("name.definition"):
-                        kind = "def"
-                    elif capture_name.startswith("name.reference"):
-                        kind = "ref"
-                    else:
-                        continue
-
-                    line_num = node.start_point[0] + 1
-                    name = node.text.decode('utf-8')
-
-                    tags.append(Tag(
-                        rel_fname=rel_fname,
-                        fname=fname,
-                        line=line_num,
-                        name=name,
-                        kind=kind
-                    ))
-            
-            return tags
-            
-        except Exception as e:
-            self.output_handlers['error'](f"Error parsing {fname}: {e}")
-            return []
-    
-    def _get_tags_from_script_block(self, fname, rel_fname, code, get_language, get_parser):
-        """Extract <script> content from Svelte/Vue files and parse as TypeScript."""
-        import re
-        pattern = re.compile(r'<script[^>]*>(.*?)</script>', re.DOTALL)
-        matches = list(pattern.finditer(code))
-        if not matches:
-            return []
-
+                self.graph = self.TAGS_CACHE.get(GRAPH_CACHE_KEY)
+            except SQLITE_ERRORS:
+                self.tags_cache_error()
+            except Exception:
+                # Unpicklable entry from an older layout; rebuild it
+                self.graph = None
+            if not isinstance(self.graph, ReferenceGraph):
+                self.graph = ReferenceGraph()
+        return self.graph
+
+    def save_graph(self) -> None:
+        """Persist the reference graph if it changed."""
+        if self.graph is None or not self.graph.dirty:
+            return
         try:
-            ts_language = get_language("typescript")
-            ts_parser = get_parser("typescript")
-        except Exception:
-            return []
-
-        scm_fname = get_scm_fname("typescript")
-        if not scm_fname:
-            return []
-
-        query_text = read_text(scm_fname, silent=True)
-        if not query_text:
-            return []
-
-        all_tags = []
-        for match in matches:
-            script_code = match.group(1)
-            line_offset = code[: match.start(1)].count("\n")
+            self.TAGS_CACHE[GRAPH_CACHE_KEY] = self.graph
+            self.graph.dirty = False
+        except SQLITE_ERRORS:
+            self.tags_cache_error()
 
-            try:
-                import tree_sitter
-                tree = ts_parser.parse(bytes(script_code, "utf-8"))
-                query = ts_language.query(query_text)
-                cursor = tree_sitter.QueryCursor(query)
-                captures = cursor.captures(tree.root_node)
-
-                for capture_name, nodes in captures.items():
-                    for node in nodes:
-                        if capture_name.startswith("name.definition"):
-                            kind = "def"
-                        elif capture_name.startswith("name.reference"):
-                            kind = "ref"
-                        else:
-                            continue
-                        all_tags.append(Tag(
-                            rel_fname=rel_fname,
-                            fname=fname,
-                            line=node.start_point[0] + 1 + line_offset,
-                            name=node.text.decode("utf-8"),
-                            kind=kind,
-                        ))
-            except Exception as e:
-                self.output_handlers["error"](f"Error parsing script block in {fname}: {e}")
-
-        return all_tags
+    def rank_files(self, graph: ReferenceGraph, personalization: Dict[str, float]) -> Dict[str, float]:
+        """PageRank the graph, reusing or warm-starting from the last run."""
+        key = (graph.uid, graph.revision, tuple(sorted(personalization.items())))
+        try:
+            previous = self.TAGS_CACHE.get(RANKS_CACHE_KEY)
+        except SQLITE_ERRORS:
+            self.tags_cache_error()
+            previous = None
+        if previous and previous["key"] == key:
+            return previous["ranks"]
+
+        ranks = self._pagerank(
+            graph.csr(),
+            personalization=personalization or None,
+            start=previous["ranks"] if previous else None,
+        )
+        try:
+            self.TAGS_CACHE[RANKS_CACHE_KEY] = {"key": key, "ranks": ranks}
+        except SQLITE_ERRORS:
+            self.tags_cache_error()
+        return ranks
 
     @staticmethod
-    def _pagerank(G, alpha=0.85, max_iter=100, tol=1e-6, personalization=None):
-        """Pure-Python PageRank (no scipy/numpy needed)."""
-        nodes = list(G.nodes())
+    def _pagerank(csr, alpha=0.85, max_iter=100, tol=1e-6, personalization=None, start=None):
+        """Weighted PageRank over CSR arrays, warm-started from start if given."""
+        nodes = csr[0]
         if not nodes:
             return {}
         n = len(nodes)
-        idx = {node: i for i, node in enumerate(nodes)}
 
-        # Initial scores
+        # Teleport distribution
         if personalization:
             total = sum(personalization.get(nd, 0.0) for nd in nodes)
-            scores = [(personalization.get(nd, 0.0) / total if total else 1.0 / n) for nd in nodes]
+            teleport = [(personalization.get(nd, 0.0) / total if total else 1.0 / n) for nd in nodes]
         else:
-            scores = [1.0 / n] * n
-
-        # Precompute out-edges per node
-        out_edges = [[] for _ in range(n)]
-        for u, v in G.edges():
-            out_edges[idx[u]].append(idx[v])
-
-        out_degree = [len(out_edges[i]) for i in range(n)]
-        teleport = scores[:]  # reuse initial as teleport distribution
-
-        for _ in range(max_iter):
-            new_scores = [0.0] * n
-            dangling_sum = sum(scores[i] for i in range(n) if out_degree[i] == 0)
-
-            for i in range(n):
-                if out_degree[i] > 0:
-                    share = scores[i] / out_degree[i]
-                    for j in out_edges[i]:
-                        new_scores[j] += share
+            teleport = [1.0 / n] * n
 
-            for i in range(n):
-                new_scores[i] = alpha * (new_scores[i] + dangling_sum * teleport[i]) + (1 - alpha) * teleport[i]
+        # Previous scores (any scale) as the initial vector
+        initial = None
+        if start:
+            warm = [start.get(nd, 0.0) for nd in nodes]
+            total = sum(warm)
+            if total > 0:
+                initial = [w / total for w in warm]
 
-            # Check convergence
-            diff = sum(abs(new_scores[i] - scores[i]) for i in range(n))
-            scores = new_scores
-            if diff < tol:
-                break
+        scores = pagerank(csr, teleport, initial, alpha, max_iter, tol)
 
         # Scale to readable values (max=100)
         max_score = max(scores) if scores else 1.0
@@ -372,87 +492,82 @@ class RepoMap:
         if mentioned_idents is None:
             mentioned_idents = set()
         
-        # Collect all tags
-        defines = defaultdict(set)
-        references = defaultdict(set)
-        definitions = defaultdict(set)
-        
-        personalization = {}
-        focus_rel_fnames = set(self.get_rel_fname(f) for f in focus_fnames)
-        
+        focus_set = set(focus_fnames)
         all_fnames = list(set(focus_fnames + context_fnames))
+        rel_fnames = [self.get_rel_fname(fname) for fname in all_fnames]
+        focus_rel_fnames = set(self.get_rel_fname(f) for f in focus_fnames)
         
-        for fname in all_fnames:
-            rel_fname = self.get_rel_fname(fname)
-            
-            if not os.path.exists(fname):
+        # Stat each file once; the mtime doubles as the existence check
+        present = []
+        for fname, rel_fname in zip(all_fnames, rel_fnames):
+            try:
+                present.append((fname, rel_fname, os.path.getmtime(fname)))
+            except OSError:
                 self.output_handlers['warning'](f"Repo-map can't include {fname}")
-                continue
-            
-            tags = self.get_tags(fname, rel_fname)
-            
-            for tag in tags:
-                if tag.kind == "def":
-                    defines[tag.name].add(rel_fname)
-                    definitions[rel_fname].add(tag.name)
-                elif tag.kind == "ref":
-                    references[tag.name].add(rel_fname)
+        loaded_tags = self.prefetch_tags(present)
+        
+        # Single pass over the tags: files keep only their definitions for
+        # ranking, and only files whose tags changed are patched into the
+        # persistent reference graph
+        graph = self.load_graph()
+        graph.retain(set(rel_fnames))
+        file_defs = []    # (rel_fname, def tags) per present file
+        personalization = {}
+        
+        for fname, rel_fname, file_mtime in present:
+            tags = loaded_tags.get(fname)
+            if tags is None:
+                tags = self.get_tags(fname, rel_fname, file_mtime)
+            defs = [tag for tag in tags if tag.kind == "def"]
+            file_defs.append((rel_fname, defs))
+            if not graph.is_current(rel_fname, file_mtime):
+                graph.update(
+                    rel_fname, file_mtime,
+                    (tag.name for tag in defs),
+                    (tag.name for tag in tags if tag.kind == "ref"),
+                )
             
             # Set personalization for chat files
-            if fname in focus_fnames:
+            if fname in focus_set:
                 personalization[rel_fname] = 100.0
         
-        # Build graph
-        G = nx.MultiDiGraph()
-        
-        # Add nodes
-        for fname in all_fnames:
-            rel_fname = self.get_rel_fname(fname)
-            G.add_node(rel_fname)
-        
-        # Add edges based on references
-        for name, ref_fnames in references.items():
-            def_fnames = defines.get(name, set())
-            for ref_fname in ref_fnames:
-                for def_fname in def_fnames:
-                    if ref_fname != def_fname:
-                        G.add_edge(ref_fname, def_fname, name=name)
+        # Files that vanished stay in the graph as isolated nodes
+        present_rel = set(rel_fname for _, rel_fname, _ in present)
+        for rel_fname in rel_fnames:
+            if rel_fname not in present_rel and not graph.is_current(rel_fname, None):
+                graph.update(rel_fname, None, (), ())
+        self.save_graph()
         
-        if not G.nodes():
+        if not len(graph):
             return []
         
-        # Run PageRank (pure-Python to avoid scipy dependency)
-        ranks = self._pagerank(G, personalization=personalization or None)
+        ranks = self.rank_files(graph, personalization)
         
         # Collect and rank tags
         ranked_tags = []
         ranked_files = set()
 
-        for fname in all_fnames:
-            rel_fname = self.get_rel_fname(fname)
-            if not os.path.exists(fname):
-                continue
-            
-            tags = self.get_tags(fname, rel_fname)
+        for rel_fname, defs in file_defs:
             file_rank = ranks.get(rel_fname, 0.0)
 
             # Exclude files with Page Rank 0 if exclude_unranked is True
             if self.exclude_unranked and file_rank == 0.0:
                 continue
             
-            for tag in tags:
-                if tag.kind == "def":
-                    boost = 1.0
-                    if tag.name in mentioned_idents:
-                        boost *= 10.0
-                    if rel_fname in mentioned_fnames:
-                        boost *= 5.0
-                    if rel_fname in focus_rel_fnames:
-                        boost *= 20.0
-
-                    final_rank = file_rank * boost
-                    ranked_tags.append((final_rank, tag))
-                    ranked_files.add(rel_fname)
+            file_boost = 1.0
+            if rel_fname in mentioned_fnames:
+                file_boost *= 5.0
+            if rel_fname in focus_rel_fnames:
+                file_boost *= 20.0
+            
+            for tag in defs:
+                boost = file_boost
+                if tag.name in mentioned_idents:
+                    boost *= 10.0
+
+                final_rank = file_rank * boost
+                ranked_tags.append((final_rank, tag))
+                ranked_files.add(rel_fname)
 
         ranked_tags.sort(key=lambda x: x[0], reverse=True)
         self.ranked_file_count = len(ranked_files)
@@ -486,6 +601,35 @@ class RepoMap:
             
             return "\n".join(result_lines)
     
+    def render_file_entry(self, rel_fname: str, lois: Tuple[int, ...], max_rank: float) -> str:
+        """Render one file's map entry: header, rank value and lines of interest."""
+        rendered = self.render_tree(str(self.root / rel_fname), rel_fname, list(lois))
+        if not rendered:
+            return ""
+        
+        # Add rank value to the output
+        rendered_lines = rendered.splitlines()
+        first_line = rendered_lines[0]
+        code_lines = rendered_lines[1:]
+        
+        return (
+            f"{first_line}\n"
+            f"(Rank value: {max_rank:.4f})\n\n" # Added an extra newline here
+            + "\n".join(code_lines)
+        )
+    
+    def file_entries(self, keys: List[Tuple[str, Tuple[int, ...], float]]) -> List[Tuple[str, int]]:
+        """(text, tokens) per (rel_fname, lois, max_rank) key, memoized per lines-of-interest set.
+        
+        Entries not cached yet are rendered and then token-counted as one batch.
+        """
+        missing = [key for key in dict.fromkeys(keys) if key not in self.tree_cache]
+        if missing:
+            texts = [self.render_file_entry(*key) for key in missing]
+            for key, text, tokens in zip(missing, texts, self.token_count_many(texts)):
+                self.tree_cache[key] = (text, tokens)
+        return [self.tree_cache[key] for key in keys]
+    
     def to_tree(self, tags: List[Tuple[float, Tag]], focus_rel_fnames: Set[str]) -> str:
         """Convert ranked tags to formatted tree output."""
         if not tags:
@@ -503,31 +647,16 @@ class RepoMap:
             reverse=True
         )
         
-        tree_parts = []
-        
-        for rel_fname, file_tag_list in sorted_files:
-            # Get lines of interest
-            lois = [tag.line for rank, tag in file_tag_list]
-            
-            # Find absolute filename
-            abs_fname = str(self.root / rel_fname)
-            
-            # Get the max rank for the file
-            max_rank = max(rank for rank, tag in file_tag_list)
-            
-            # Render the tree for this file
-            rendered = self.render_tree(abs_fname, rel_fname, lois)
-            if rendered:
-                # Add rank value to the output
-                rendered_lines = rendered.splitlines()
-                first_line = rendered_lines[0]
-                code_lines = rendered_lines[1:]
-                
-                tree_parts.append(
-                    f"{first_line}\n"
-                    f"(Rank value: {max_rank:.4f})\n\n" # Added an extra newline here
-                    + "\n".join(code_lines)
-                )
+        # Lines of interest and the max rank per file
+        keys = [
+            (
+                rel_fname,
+                tuple(sorted(set(tag.line for rank, tag in file_tag_list))),
+                max(rank for rank, tag in file_tag_list),
+            )
+            for rel_fname, file_tag_list in sorted_files
+        ]
+        tree_parts = [text for text, _ in self.file_entries(keys) if text]
         
         return "\n\n".join(tree_parts)
     
@@ -552,14 +681,54 @@ class RepoMap:
         if not force_refresh and cache_key in self.map_cache:
             return self.map_cache[cache_key]
         
+        # Persistent copy, valid while no mapped file has changed
+        disk_key, mtimes_digest = self.map_cache_keys(cache_key)
+        if not force_refresh:
+            try:
+                entry = self.TAGS_CACHE.get(disk_key)
+            except SQLITE_ERRORS:
+                self.tags_cache_error()
+                entry = None
+            if entry and entry["mtimes"] == mtimes_digest:
+                self.ranked_file_count = entry["ranked_file_count"]
+                self.map_cache[cache_key] = entry["map"]
+                return entry["map"]
+        
         result = self.get_ranked_tags_map_uncached(
             focus_fnames, context_fnames, max_map_tokens,
             mentioned_fnames, mentioned_idents
         )
         
         self.map_cache[cache_key] = result
+        try:
+            self.TAGS_CACHE[disk_key] = {
+                "mtimes": mtimes_digest,
+                "map": result,
+                "ranked_file_count": self.ranked_file_count,
+            }
+        except SQLITE_ERRORS:
+            self.tags_cache_error()
         return result
     
+    def map_cache_keys(self, cache_key: tuple) -> Tuple[str, str]:
+        """Persistent cache slot for a map request, and a digest of its files' mtimes.
+        
+        The slot covers the file set, focus/mentioned sets and budget, so an
+        edit overwrites the request's previous map instead of adding one.
+        """
+        request = repr((cache_key, self.exclude_unranked, self.map_cache_tag))
+        mtimes = hashlib.sha1()
+        for fname in sorted(set(cache_key[0]) | set(cache_key[1])):
+            try:
+                file_mtime = os.path.getmtime(fname)
+            except OSError:
+                file_mtime = None
+            mtimes.update(f"{fname}\0{file_mtime}\n".encode())
+        return (
+            MAP_CACHE_PREFIX + hashlib.sha1(request.encode()).hexdigest(),
+            mtimes.hexdigest(),
+        )
+    
     def get_ranked_tags_map_uncached(
         self,
         focus_fnames: List[str],
@@ -581,37 +750,56 @@ class RepoMap:
             [self.get_rel_fname(f) for f in context_fnames]
         )
         
-        # Binary search to find the right number of tags
-        focus_rel_fnames = set(self.get_rel_fname(f) for f in focus_fnames)
-        
-        def try_tags(num_tags: int) -> Tuple[Optional[str], int]:
-            if num_tags <= 0:
-                return None, 0
-            
-            selected_tags = ranked_tags[:num_tags]
-            tree_output = self.to_tree(selected_tags, focus_rel_fnames)
-            
-            if not tree_output:
-                return None, 0
-            
-            tokens = self.token_count(tree_output)
-            return tree_output, tokens
-        
-        # Binary search for optimal number of tags
+        # Lay out the ranking per file. Tags are sorted by rank, so files in
+        # order of first appearance is to_tree()'s order, and each file's
+        # first tag carries its max rank.
+        file_order = []    # rel_fname per file, in output order
+        first_pos = []     # position of each file's first tag
+        positions = {}     # rel_fname -> positions of its tags
+        lines = {}         # rel_fname -> lines of its tags
+        max_ranks = {}
+        for pos, (rank, tag) in enumerate(ranked_tags):
+            rel_fname = tag.rel_fname
+            if rel_fname not in positions:
+                file_order.append(rel_fname)
+                first_pos.append(pos)
+                positions[rel_fname] = []
+                lines[rel_fname] = []
+                max_ranks[rel_fname] = rank
+            positions[rel_fname].append(pos)
+            lines[rel_fname].append(tag.line)
+        
+        def try_tags(num_tags: int) -> Tuple[List[str], int]:
+            """Map entries for the top num_tags tags and their summed token count."""
+            keys = []
+            for rel_fname in file_order[:bisect_left(first_pos, num_tags)]:
+                count = bisect_left(positions[rel_fname], num_tags)
+                lois = tuple(sorted(set(lines[rel_fname][:count])))
+                keys.append((rel_fname, lois, max_ranks[rel_fname]))
+            texts, tokens = [], 0
+            for text, text_tokens in self.file_entries(keys):
+                if text:
+                    texts.append(text)
+                    tokens += text_tokens
+            # One token per "\n\n" separator
+            return texts, tokens + max(0, len(texts) - 1)
+        
+        # Binary search for optimal number of tags; entries are rendered and
+        # counted once per lines-of-interest set, so probes mostly sum cached counts
         left, right = 0, len(ranked_tags)
-        best_tree = None
+        best_texts = None
         
         while left <= right:
             mid = (left + right) // 2
-            tree_output, tokens = try_tags(mid)
+            texts, tokens = try_tags(mid)
             
-            if tree_output and tokens <= max_map_tokens:
-                best_tree = tree_output
+            if texts and tokens <= max_map_tokens:
+                best_texts = texts
                 left = mid + 1
             else:
                 right = mid - 1
         
-        return best_tree
+        return "\n\n".join(best_texts) if best_texts else None
     
     def get_repo_map(
         self,
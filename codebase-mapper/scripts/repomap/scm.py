@@ -2,9 +2,14 @@
 SCM file handling for RepoMap.
 """
 
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 
+from utils import read_text
+
+
+@lru_cache(maxsize=None)
 def get_scm_fname(lang: str) -> Optional[str]:
     """Get the SCM query file for a language."""
     scm_files = {
@@ -60,3 +65,12 @@ def get_scm_fname(lang: str) -> Optional[str]:
             return str(scm_path)
     
     return None
+
+
+@lru_cache(maxsize=None)
+def get_scm_query(lang: str) -> Optional[str]:
+    """Get the text of the SCM tags query for a language."""
+    scm_fname = get_scm_fname(lang)
+    if not scm_fname:
+        return None
+    return read_text(scm_fname, silent=True) or None
@@ -4,6 +4,7 @@ Utility functions for RepoMap.
 
 import os
 import sys
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional, List
 from collections import namedtuple
@@ -18,18 +19,39 @@ except ImportError:
 Tag = namedtuple("Tag", "rel_fname fname line name kind".split())
 
 
+@lru_cache(maxsize=None)
+def get_encoding(model_name: str = "gpt-4"):
+    """Get the tiktoken encoding for a model, loaded once per process."""
+    try:
+        return tiktoken.encoding_for_model(model_name)
+    except KeyError:
+        # Fallback for unknown models
+        return tiktoken.get_encoding("cl100k_base")
+
+
 def count_tokens(text: str, model_name: str = "gpt-4") -> int:
     """Count tokens in text using tiktoken."""
     if not text:
         return 0
     
-    try:
-        encoding = tiktoken.encoding_for_model(model_name)
-    except KeyError:
-        # Fallback for unknown models
-        encoding = tiktoken.get_encoding("cl100k_base")
+    return len(get_encoding(model_name).encode(text))
+
+
+def count_tokens_many(
+    texts: List[str], model_name: str = "gpt-4", num_threads: int = 8
+) -> List[int]:
+    """Count tokens in many texts, encoding them as one batch across threads."""
+    counts = [0] * len(texts)
+    todo = [i for i, text in enumerate(texts) if text]
+    if not todo:
+        return counts
     
-    return len(encoding.encode(text))
+    encoded = get_encoding(model_name).encode_batch(
+        [texts[i] for i in todo], num_threads=num_threads
+    )
+    for i, tokens in zip(todo, encoded):
+        counts[i] = len(tokens)
+    return counts
 
 
 def read_text(filename: str, encoding: str = "utf-8", silent: bool = False) -> Optional[str]:
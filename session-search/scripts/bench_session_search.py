@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""Benchmark session_search.py against a synthetic ~/.claude/projects tree."""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+SCRIPT = Path(__file__).with_name("session_search.py")
+WORDS = (
+    "index parser widget timeline sqlite search refactor deploy cache window "
+    "render schema worker socket config token budget commit branch review"
+).split()
+QUERY = "needle phrase"
+# Marks a --keep directory as generated here, so a rerun may replace its history
+KEEP_MARKER = ".session-bench"
+
+# (name, subcommand args); cold cases drop the index first
+CASES = [
+    ("scan cold", ["scan", "--all-projects"], True),
+    ("scan warm", ["scan", "--all-projects"], False),
+    ("scan timeline", ["scan", "--all-projects", "-t"], False),
+    ("search", ["search", QUERY, "--all-projects"], False),
+    ("search no-index", ["search", QUERY, "--all-projects", "--no-index"], False),
+    ("search ranked", ["search", f'"{QUERY}"', "--all-projects", "--ranked"], False),
+    ("search semantic", ["search", QUERY, "--all-projects", "--semantic"], False),
+    ("search jsonl.gz", ["search", QUERY, "--all-projects", "-f", "jsonl", "-z", "gzip"], False),
+    ("search timeline", ["search", QUERY, "--all-projects", "-t"], False),
+    ("extract", ["extract", "--all-projects", "-n", "1000"], False),
+]
+
+
+# ── Synthetic History ────────────────────────────────────────
+
+def _text(rng: random.Random, size: int, needle_ratio: float) -> str:
+    words = []
+    while sum(len(w) + 1 for w in words) < size:
+        words.append(rng.choice(WORDS))
+    if rng.random() < needle_ratio:
+        words.insert(rng.randrange(len(words) + 1), QUERY)
+    return " ".join(words)
+
+
+def _session_lines(rng: random.Random, args, session_id: str, start: datetime) -> list[dict]:
+    lines = []
+    ts = start
+    for i in range(args.messages):
+        ts += timedelta(seconds=rng.randint(5, 240))
+        base = {"sessionId": session_id, "uuid": str(uuid.UUID(int=rng.getrandbits(128))),
+                "timestamp": ts.isoformat().replace("+00:00", "Z")}
+        roll = rng.random()
+        if roll < args.speak_ratio:
+            tool_id = f"toolu_speak_{i}"
+            lines.append({**base, "type": "assistant", "message": {"content": [
+                {"type": "tool_use", "id": tool_id, "name": "mcp__speak__ask",
+                 "input": {"prompt": _text(rng, 60, args.needle_ratio)}},
+            ]}})
+            answer = json.dumps({"answer": rng.choice(WORDS)})
+            lines.append({**base, "type": "user", "message": {"content": [
+                {"type": "tool_result", "tool_use_id": tool_id,
+                 "content": [{"type": "text", "text": answer}]},
+            ]}})
+        elif roll < args.speak_ratio + args.tool_ratio:
+            tool_id = f"toolu_{i}"
+            lines.append({**base, "type": "assistant", "message": {"content": [
+                {"type": "tool_use", "id": tool_id, "name": "Bash", "input": {"command": "ls"}},
+            ]}})
+            lines.append({**base, "type": "user", "message": {"content": [
+                {"type": "tool_result", "tool_use_id": tool_id,
+                 "content": _text(rng, args.message_size * 4, 0)},
+            ]}})
+        elif roll < 0.9:
+            role = "user" if i % 2 == 0 else "assistant"
+            content = _text(rng, args.message_size, args.needle_ratio)
+            if role == "assistant":
+                content = [{"type": "text", "text": content}]
+            lines.append({**base, "type": role, "message": {"role": role, "content": content}})
+        else:
+            lines.append({**base, "type": "progress", "data": _text(rng, 80, 0)})
+    return lines
+
+
+def generate_history(home: Path, args) -> dict:
+    """Write a synthetic projects tree under home; returns size totals."""
+    rng = random.Random(args.seed)
+    projects_dir = home / ".claude" / "projects"
+    totals = {"projects": args.projects, "sessions": 0, "lines": 0, "bytes": 0}
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    for p in range(args.projects):
+        project_path = f"/bench/project_{p}"
+        project_dir = projects_dir / project_path.replace("/", "-").replace("_", "-")
+        project_dir.mkdir(parents=True, exist_ok=True)
+        entries = []
+        for s in range(args.sessions):
+            session_id = str(uuid.UUID(int=rng.getrandbits(128)))
+            session_file = project_dir / f"{session_id}.jsonl"
+            session_start = start + timedelta(days=rng.randint(0, 700), hours=rng.randint(0, 23))
+            lines = _session_lines(rng, args, session_id, session_start)
+            with open(session_file, "w") as f:
+                for line in lines:
+                    f.write(json.dumps(line, separators=(",", ":")) + "\n")
+            size = session_file.stat().st_size
+            totals["sessions"] += 1
+            totals["lines"] += len(lines)
+            totals["bytes"] += size
+            entries.append({
+                "sessionId": session_id,
+                "fullPath": str(session_file),
+                "fileMtime": int(session_file.stat().st_mtime * 1000),
+                "projectPath": project_path,
+            })
+        (project_dir / "sessions-index.json").write_text(json.dumps({"version": 1, "entries": entries}))
+    return totals
+
+
+# ── Timing ───────────────────────────────────────────────────
+
+def run_case(home: Path, argv: list[str], out_dir: Path, jobs: int) -> tuple[float, float]:
+    """Run one CLI invocation; returns (seconds, peak RSS in MB)."""
+    env = {**os.environ, "HOME": str(home)}
+    cmd = [sys.executable, str(SCRIPT), *argv, "-o", str(out_dir), "-j", str(jobs)]
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    _, status, usage = os.wait4(proc.pid, 0)
+    elapsed = time.perf_counter() - start
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    stderr = proc.stderr.read().decode()
+    proc.stderr.close()
+    if proc.returncode != 0:
+        raise RuntimeError(f"{' '.join(argv)} failed ({proc.returncode}): {stderr.strip()}")
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss_mb = usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    return elapsed, rss_mb
+
+
+def run_benchmarks(home: Path, totals: dict, args) -> dict:
+    index_dir = home / ".claude" / "session-search"
+    out_dir = home / "out"
+    mb = totals["bytes"] / (1024 * 1024)
+    results = {}
+    for name, argv, cold in CASES:
+        times, peaks = [], []
+        for _ in range(args.repeat):
+            if cold:
+                shutil.rmtree(index_dir, ignore_errors=True)
+            elapsed, rss = run_case(home, argv, out_dir, args.jobs)
+            times.append(elapsed)
+            peaks.append(rss)
+        best = min(times)
+        results[name] = {
+            "seconds": round(best, 4),
+            "mb_per_s": round(mb / best, 2),
+            "lines_per_s": round(totals["lines"] / best),
+            "peak_rss_mb": round(max(peaks), 1),
+        }
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Cases slower, or heavier, than baseline by more than threshold."""
+    regressions = []
+    for name, cur in results.items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            continue
+        for key in ("seconds", "peak_rss_mb"):
+            if base[key] and cur[key] > base[key] * (1 + threshold):
+                change = (cur[key] / base[key] - 1) * 100
+                regressions.append(f"{name}: {key} {base[key]} -> {cur[key]} (+{change:.0f}%)")
+    return regressions
+
+
+def print_table(results: dict, baseline: dict | None):
+    print(f"{'case':<18} {'seconds':>9} {'MB/s':>9} {'lines/s':>10} {'RSS MB':>8} {'vs base':>8}")
+    print("─" * 66)
+    for name, r in results.items():
+        delta = ""
+        base = (baseline or {}).get("results", {}).get(name)
+        if base and base["seconds"]:
+            delta = f"{(r['seconds'] / base['seconds'] - 1) * 100:+.0f}%"
+        print(f"{name:<18} {r['seconds']:>9.3f} {r['mb_per_s']:>9.1f} "
+              f"{r['lines_per_s']:>10} {r['peak_rss_mb']:>8.1f} {delta:>8}")
+
+
+# ── CLI ──────────────────────────────────────────────────────
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark session_search.py on synthetic history")
+    parser.add_argument("--projects", type=int, default=5, help="Projects to generate")
+    parser.add_argument("--sessions", type=int, default=20, help="Sessions per project")
+    parser.add_argument("--messages", type=int, default=500, help="Entries per session")
+    parser.add_argument("--message-size", type=int, default=300, help="Approx. chars per message")
+    parser.add_argument("--tool-ratio", type=float, default=0.4, help="Share of tool_use/tool_result pairs")
+    parser.add_argument("--speak-ratio", type=float, default=0.02, help="Share of speak MCP Q/A pairs")
+    parser.add_argument("--needle-ratio", type=float, default=0.01, help="Share of messages with the query")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case (best time is kept)")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Passed through to session_search.py")
+    parser.add_argument(
+        "--keep", type=str, default=None,
+        help="Generate into DIR (new, empty or from an earlier --keep run) and keep it",
+    )
+    parser.add_argument("--baseline", type=str, default=None, help="Compare against a saved baseline")
+    parser.add_argument("--save-baseline", type=str, default=None, help="Write results as a baseline")
+    parser.add_argument(
+        "--threshold", type=float, default=0.10,
+        help="Relative slowdown counted as a regression (default: 0.10)",
+    )
+    args = parser.parse_args()
+
+    if args.keep:
+        home = Path(args.keep)
+        if home.exists() and not (home / KEEP_MARKER).exists() and (
+            not home.is_dir() or any(home.iterdir())
+        ):
+            parser.error(f"--keep {home}: not an empty directory or one from an earlier --keep run")
+        home.mkdir(parents=True, exist_ok=True)
+        (home / KEEP_MARKER).touch()
+    else:
+        home = Path(tempfile.mkdtemp(prefix="session-bench-"))
+    try:
+        shutil.rmtree(home / ".claude", ignore_errors=True)
+        t = time.perf_counter()
+        totals = generate_history(home, args)
+        print(f"Generated {totals['sessions']} sessions, {totals['lines']} lines, "
+              f"{totals['bytes'] / (1024 * 1024):.1f} MB in {time.perf_counter() - t:.1f}s")
+        print()
+
+        results = run_benchmarks(home, totals, args)
+        baseline = json.loads(Path(args.baseline).read_text()) if args.baseline else None
+        print_table(results, baseline)
+        print()
+
+        report = {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "jobs": args.jobs,
+            "dataset": totals,
+            "results": results,
+        }
+        if args.save_baseline:
+            Path(args.save_baseline).write_text(json.dumps(report, indent=2))
+            print(f"Baseline saved to: {args.save_baseline}")
+
+        regressions = compare(results, baseline, args.threshold) if baseline else []
+        if baseline and baseline.get("dataset") != totals:
+            print("Warning: dataset differs from baseline; comparison is indicative only")
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        print(json.dumps(report, indent=2))
+        sys.exit(1 if regressions else 0)
+    finally:
+        if not args.keep:
+            shutil.rmtree(home, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
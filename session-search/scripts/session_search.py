@@ -2,19 +2,61 @@
 """Unified Claude Code session history: search, scan, extract with multi-project support."""
 
 import argparse
+import collections
+import ctypes
+import ctypes.util
+import functools
+import gzip
+import hashlib
+import heapq
+import importlib.util
 import json
+import math
+import mmap
+import operator
 import os
+import queue
+import random
 import re
+import select
+import signal
+import socket
+import socketserver
+import stat
+import sqlite3
+import struct
 import sys
+import threading
+import time
+import zlib
+from array import array
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack, contextmanager
 from datetime import datetime, timedelta
+from itertools import accumulate, combinations, islice
 from pathlib import Path
-from typing import Iterator
+from typing import Iterable, Iterator
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    orjson = None
+    _json_loads = json.loads
 
 CLAUDE_DIR = Path.home() / ".claude"
 PROJECTS_DIR = CLAUDE_DIR / "projects"
 CHARS_PER_TOKEN = 4
 BOX_WIDTH = 60
 TIMELINE_WIDTH = 80
+INDEX_DB = CLAUDE_DIR / "session-search" / "index.db"
+INDEX_VERSION = 9
+HEAD_HASH_BYTES = 4096
+# Unanswered speak MCP questions are dropped after this many lines
+SPEAK_PAIR_LINES = 2000
+# Top-level marker a user/assistant line must contain (compact or spaced JSON)
+MESSAGE_TYPE_MARKER = re.compile(rb'"type": ?"(?:user|assistant)"')
 
 
 # ── Box Drawing ──────────────────────────────────────────────
@@ -66,45 +108,55 @@ def find_project_dir(cwd: str) -> Path | None:
     return None
 
 
-def iter_project_sessions(project_dir: Path) -> Iterator[Path]:
+def iter_project_sessions(project_dir: Path, include_agents: bool = False) -> Iterator[Path]:
     for session_file in project_dir.glob("*.jsonl"):
-        if not session_file.name.startswith("agent-"):
+        if include_agents or not session_file.name.startswith("agent-"):
             yield session_file
 
 
+def read_sessions_index(index_file: Path) -> tuple[str, list[dict]] | None:
+    """(projectPath, entries) from a sessions-index.json, or None if unusable."""
+    try:
+        data = json.loads(index_file.read_text())
+    except (json.JSONDecodeError, OSError):
+        return None
+    entries = data.get("entries", [])
+    if not entries:
+        return None
+    return entries[0].get("projectPath", ""), entries
+
+
 def discover_projects(
     folder: str | None = None,
     since_minutes: int | None = None,
+    catalogue: "ProjectCatalogue | None" = None,
 ) -> list[dict]:
     """Discover projects using sessions-index.json for fast filtering.
 
+    With a catalogue, only index files of projects under folder are stat'ed
+    and only changed ones decoded; otherwise every index file is read.
     Returns list of {project_dir, project_path, session_entries}.
     """
     now_ms = datetime.now().timestamp() * 1000
     cutoff_ms = (now_ms - since_minutes * 60 * 1000) if since_minutes else None
-    results = []
+    norm_folder = str(Path(folder).resolve()) if folder else None
+    if catalogue is not None:
+        return catalogue.lookup(norm_folder, cutoff_ms)
 
+    results = []
     for index_file in PROJECTS_DIR.glob("*/sessions-index.json"):
         project_dir = index_file.parent
         # skip archive dirs
         if "_archive" in project_dir.parts:
             continue
-        try:
-            data = json.loads(index_file.read_text())
-        except (json.JSONDecodeError, OSError):
-            continue
-
-        entries = data.get("entries", [])
-        if not entries:
+        loaded = read_sessions_index(index_file)
+        if loaded is None:
             continue
-
-        project_path = entries[0].get("projectPath", "")
+        project_path, entries = loaded
 
         # folder filter: projectPath must start with the given folder
-        if folder:
-            norm_folder = str(Path(folder).resolve())
-            if not project_path.startswith(norm_folder):
-                continue
+        if norm_folder and not project_path.startswith(norm_folder):
+            continue
 
         # time filter: keep only entries modified after cutoff
         if cutoff_ms:
@@ -122,16 +174,19 @@ def discover_projects(
     return results
 
 
-def resolve_projects(args) -> list[dict]:
+def resolve_projects(args, index: "MessageIndex | None" = None) -> list[dict]:
     """Resolve project scope from CLI args into a list of project dicts."""
+    catalogue = index.catalogue if index is not None else None
     if args.all_projects:
         return discover_projects(
             since_minutes=getattr(args, "since", None),
+            catalogue=catalogue,
         )
     if args.folder:
         return discover_projects(
             folder=args.folder,
             since_minutes=getattr(args, "since", None),
+            catalogue=catalogue,
         )
     # single project
     project_dir = find_project_dir(args.project)
@@ -140,99 +195,337 @@ def resolve_projects(args) -> list[dict]:
     return [{"project_dir": project_dir, "project_path": args.project, "session_entries": None}]
 
 
-def iter_sessions_for_project(proj: dict, since_minutes: int | None = None) -> Iterator[Path]:
-    """Yield session files for a project dict, optionally time-filtered."""
+def iter_sessions_for_project(
+    proj: dict,
+    since_minutes: int | None = None,
+    include_agents: bool = False,
+) -> Iterator[Path]:
+    """Yield session files for a project dict, optionally time-filtered.
+
+    include_agents adds agent-* sub-session files, which sessions-index.json
+    does not list.
+    """
+    cutoff = datetime.now().timestamp() - since_minutes * 60 if since_minutes else None
     if proj["session_entries"] is not None:
-        cutoff_ms = None
-        if since_minutes:
-            cutoff_ms = datetime.now().timestamp() * 1000 - since_minutes * 60 * 1000
         for entry in proj["session_entries"]:
-            if cutoff_ms and entry.get("fileMtime", 0) < cutoff_ms:
+            if cutoff and entry.get("fileMtime", 0) < cutoff * 1000:
                 continue
             p = Path(entry["fullPath"])
             if p.exists():
                 yield p
+        if not include_agents:
+            return
+        candidates = proj["project_dir"].glob("agent-*.jsonl")
     else:
-        for sf in iter_project_sessions(proj["project_dir"]):
-            if since_minutes:
-                cutoff = datetime.now().timestamp() - since_minutes * 60
-                if sf.stat().st_mtime < cutoff:
-                    continue
-            yield sf
+        candidates = iter_project_sessions(proj["project_dir"], include_agents)
+    for sf in candidates:
+        if cutoff and sf.stat().st_mtime < cutoff:
+            continue
+        yield sf
 
 
 # ── Message Extraction ───────────────────────────────────────
 
-def extract_messages(session_file: Path) -> list[dict]:
-    """Extract messages with source refs, including speak MCP interactions."""
-    messages = []
-    speak_questions = {}
+@contextmanager
+def map_session(session_file: Path) -> Iterator[mmap.mmap | bytes]:
+    """Read-only memory map of a session file (empty bytes for an empty file)."""
+    with open(session_file, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b""
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            yield buf
+
+
+def iter_line_spans(
+    buf: mmap.mmap | bytes,
+    offset: int = 0,
+    line_num: int = 0,
+) -> Iterator[tuple[int, int, int]]:
+    """Yield (line_num, start, end) for each line from a byte offset.
+
+    end excludes the newline, so end + 1 is where the next read resumes; a
+    trailing line without newline ends at len(buf).
+    """
+    size = len(buf)
+    while offset < size:
+        nl = buf.find(b"\n", offset)
+        if nl == -1:
+            nl = size
+        line_num += 1
+        yield line_num, offset, nl
+        offset = nl + 1
+
+
+def _raw_needle(query: str | None) -> re.Pattern | None:
+    """Byte pattern to pre-check raw JSONL lines for, or None if unsafe.
+
+    Only printable ASCII other than quote and backslash is guaranteed to
+    appear verbatim in a JSON-encoded line.
+    """
+    if query and all(" " <= c <= "~" and c not in '"\\' for c in query):
+        return re.compile(re.escape(query.encode()), re.IGNORECASE)
+    return None
+
+
+def _line_may_match(
+    buf: mmap.mmap | bytes,
+    start: int,
+    end: int,
+    needle: re.Pattern | None,
+    pairer: "SpeakPairer",
+) -> bool:
+    """Cheap check on a line's raw bytes, in place, before it is copied and decoded.
+
+    Speak MCP lines bypass the needle check: their dialog record pairs a
+    question and an answer from different lines.
+    """
+    if not MESSAGE_TYPE_MARKER.search(buf, start, end):
+        return False
+    if needle is None or needle.search(buf, start, end):
+        return True
+    if buf.find(b"speak", start, end) != -1 and buf.find(b"tool_use", start, end) != -1:
+        return True
+    return pairer.may_answer(buf, start, end)
+
+
+class SpeakPairer:
+    """Pairs speak MCP questions (tool_use) with their answers (tool_result).
+
+    Pending questions are kept in line order and evicted once more than
+    SPEAK_PAIR_LINES lines old, so memory stays bounded however long the
+    session runs. With record=True each completed pair is also kept as
+    (message, tool_use_id, question, answer, question_line).
+    """
+
+    def __init__(self, state: dict | None = None, record: bool = False):
+        self.pending: collections.OrderedDict[str, tuple[str, int]] = collections.OrderedDict(
+            (tool_id, (question, line)) for tool_id, (question, line) in (state or {}).items()
+        )
+        self.dialogs: list[tuple] | None = [] if record else None
 
-    with open(session_file) as f:
-        for line_num, line in enumerate(f, 1):
-            line = line.strip()
-            if not line:
+    def state(self) -> dict:
+        """Pending questions as JSON-ready {tool_use_id: [question, line]}."""
+        return {tool_id: [question, line] for tool_id, (question, line) in self.pending.items()}
+
+    def evict(self, line_num: int):
+        while self.pending:
+            tool_id, (_, line) = next(iter(self.pending.items()))
+            if line_num - line <= SPEAK_PAIR_LINES:
+                return
+            del self.pending[tool_id]
+
+    def may_answer(self, buf: mmap.mmap | bytes, start: int, end: int) -> bool:
+        """True if the raw line mentions a pending question's tool_use_id."""
+        return any(buf.find(tool_id.encode(), start, end) != -1 for tool_id in self.pending)
+
+    def ask(self, tool_id: str, question: str, line_num: int):
+        self.pending[tool_id] = (question, line_num)
+
+    def answer(self, tool_id: str) -> tuple[str, int] | None:
+        """Pop the pending (question, line) for tool_id, if any."""
+        return self.pending.pop(tool_id, None)
+
+
+def _decode_line(raw: bytes) -> dict | None:
+    try:
+        entry = _json_loads(raw)
+    except ValueError:
+        return None
+    if not isinstance(entry, dict) or entry.get("type") not in ("user", "assistant"):
+        return None
+    return entry
+
+
+def _entry_messages(
+    entry: dict,
+    session_file: Path,
+    line_num: int,
+    pairer: SpeakPairer,
+) -> list[dict]:
+    """Turn one decoded JSONL entry into message records.
+
+    pairer carries pending speak MCP questions across lines.
+    """
+    messages = []
+    msg_content = entry.get("message", {}).get("content", "")
+    session_id = entry.get("sessionId", session_file.stem)
+    timestamp = entry.get("timestamp", "")
+    uuid = entry.get("uuid", "")
+
+    if isinstance(msg_content, list):
+        for block in msg_content:
+            if not isinstance(block, dict):
                 continue
-            try:
-                entry = json.loads(line)
-            except json.JSONDecodeError:
+            # speak MCP questions from assistant
+            if block.get("type") == "tool_use" and "speak" in block.get("name", ""):
+                tool_id = block.get("id", "")
+                inp = block.get("input", {})
+                question = inp.get("prompt") or inp.get("message", "")
+                if tool_id and question:
+                    pairer.ask(tool_id, question, line_num)
+            # speak MCP responses from user
+            if block.get("type") == "tool_result":
+                tool_id = block.get("tool_use_id", "")
+                asked = pairer.answer(tool_id) if tool_id in pairer.pending else None
+                if asked:
+                    question, question_line = asked
+                    answer = _parse_speak_answer(block)
+                    if answer:
+                        msg = {
+                            "type": "user",
+                            "uuid": uuid,
+                            "timestamp": timestamp,
+                            "content": f"[Dialog] Q: {question}\nA: {answer}",
+                            "session_id": session_id,
+                            "source_file": str(session_file),
+                            "source_line": line_num,
+                            "is_speak_mcp": True,
+                        }
+                        messages.append(msg)
+                        if pairer.dialogs is not None:
+                            pairer.dialogs.append((msg, tool_id, question, answer, question_line))
+
+        text_parts = [
+            p.get("text", "")
+            for p in msg_content
+            if isinstance(p, dict) and p.get("type") == "text"
+        ]
+        msg_content = "\n".join(text_parts)
+
+    if not isinstance(msg_content, str) or not msg_content.strip():
+        return messages
+
+    messages.append({
+        "type": entry["type"],
+        "uuid": uuid,
+        "timestamp": timestamp,
+        "content": msg_content,
+        "session_id": session_id,
+        "source_file": str(session_file),
+        "source_line": line_num,
+    })
+    return messages
+
+
+def iter_file_messages(
+    session_file: Path,
+    query: str | None = None,
+    dialogs_only: bool = False,
+) -> Iterator[dict]:
+    """Stream messages from one session file, optionally only those matching query.
+
+    dialogs_only keeps just speak MCP dialog records, with their "question"
+    and "answer" split out.
+    """
+    regex = re.compile(re.escape(query), re.IGNORECASE) if query else None
+    needle = _raw_needle(query)
+    pairer = SpeakPairer(record=dialogs_only)
+    with map_session(session_file) as buf:
+        for line_num, start, end in iter_line_spans(buf):
+            pairer.evict(line_num)
+            if not _line_may_match(buf, start, end, needle, pairer):
                 continue
-            if entry.get("type") not in ("user", "assistant"):
+            entry = _decode_line(buf[start:end])
+            if entry is None:
                 continue
-
-            msg_content = entry.get("message", {}).get("content", "")
-            session_id = entry.get("sessionId", session_file.stem)
-            timestamp = entry.get("timestamp", "")
-            uuid = entry.get("uuid", "")
-
-            if isinstance(msg_content, list):
-                for block in msg_content:
-                    if not isinstance(block, dict):
-                        continue
-                    # speak MCP questions from assistant
-                    if block.get("type") == "tool_use" and "speak" in block.get("name", ""):
-                        tool_id = block.get("id", "")
-                        inp = block.get("input", {})
-                        question = inp.get("prompt") or inp.get("message", "")
-                        if tool_id and question:
-                            speak_questions[tool_id] = question
-                    # speak MCP responses from user
-                    if block.get("type") == "tool_result":
-                        tool_id = block.get("tool_use_id", "")
-                        if tool_id in speak_questions:
-                            answer = _parse_speak_answer(block)
-                            if answer:
-                                messages.append({
-                                    "type": "user",
-                                    "uuid": uuid,
-                                    "timestamp": timestamp,
-                                    "content": f"[Dialog] Q: {speak_questions[tool_id]}\nA: {answer}",
-                                    "session_id": session_id,
-                                    "source_file": str(session_file),
-                                    "source_line": line_num,
-                                    "is_speak_mcp": True,
-                                })
-
-                text_parts = [
-                    p.get("text", "")
-                    for p in msg_content
-                    if isinstance(p, dict) and p.get("type") == "text"
+            messages = _entry_messages(entry, session_file, line_num, pairer)
+            if dialogs_only:
+                messages = [
+                    {**msg, "question": question, "answer": answer}
+                    for msg, _, question, answer, _ in pairer.dialogs
                 ]
-                msg_content = "\n".join(text_parts)
+                pairer.dialogs.clear()
+            for msg in messages:
+                if regex is None or regex.search(msg["content"]):
+                    yield msg
+
+
+def extract_messages(
+    session_file: Path,
+    query: str | None = None,
+    dialogs_only: bool = False,
+) -> list[dict]:
+    """Extract messages with source refs, including speak MCP interactions.
 
-            if not isinstance(msg_content, str) or not msg_content.strip():
+    Lines that cannot be user/assistant entries, or cannot contain query,
+    are rejected on their raw bytes before JSON decoding.
+    """
+    return list(iter_file_messages(session_file, query, dialogs_only))
+
+
+def parse_session_tail(
+    session_file: Path,
+    offset: int,
+    line_count: int,
+    speak_state: dict,
+) -> tuple[list[dict], int, int, dict, list[tuple], int]:
+    """Parse lines after offset.
+
+    Returns (messages, offset, line_count, speak state, dialogs, tail_end)
+    where each dialog is (index into messages, tool_use_id, question, answer,
+    question_line). A trailing line without newline (possibly still being
+    written) is parsed too, but offset and line_count stop before it and
+    tail_end is the size it was read at (0 when there is none).
+    """
+    messages = []
+    dialogs = []
+    tail_end = 0
+    pairer = SpeakPairer(speak_state, record=True)
+    with map_session(session_file) as buf:
+        size = len(buf)
+        for line_num, start, end in iter_line_spans(buf, offset, line_count):
+            if end < size:
+                offset, line_count = end + 1, line_num
+            else:
+                tail_end = size
+            pairer.evict(line_num)
+            if not _line_may_match(buf, start, end, None, pairer):
                 continue
+            entry = _decode_line(buf[start:end])
+            if entry is None:
+                continue
+            first = len(messages)
+            new = _entry_messages(entry, session_file, line_num, pairer)
+            messages.extend(new)
+            if pairer.dialogs:
+                positions = {id(msg): first + i for i, msg in enumerate(new)}
+                dialogs.extend((positions[id(msg)], *rest) for msg, *rest in pairer.dialogs)
+                pairer.dialogs.clear()
+    return messages, offset, line_count, pairer.state(), dialogs, tail_end
 
-            messages.append({
-                "type": entry["type"],
-                "uuid": uuid,
-                "timestamp": timestamp,
-                "content": msg_content,
-                "session_id": session_id,
-                "source_file": str(session_file),
-                "source_line": line_num,
-            })
-    return messages
+
+def _parse_tail_job(job: tuple) -> tuple[list[dict], int, int, dict, list[tuple], int]:
+    return parse_session_tail(*job)
+
+
+class _SerialPool:
+    """Stand-in for ProcessPoolExecutor when only one job is requested."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def map(self, fn, iterable, chunksize: int = 1):
+        return map(fn, iterable)
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False):
+        pass
+
+
+def worker_pool(jobs: int, task_count: int):
+    """Process pool for parsing, or an in-process map when parallelism won't help."""
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    if jobs <= 1 or task_count <= 1:
+        return _SerialPool()
+    return ProcessPoolExecutor(max_workers=min(jobs, task_count))
+
+
+def _chunksize(task_count: int, jobs: int) -> int:
+    return max(1, task_count // (max(jobs, 1) * 4))
 
 
 def _parse_speak_answer(block: dict) -> str | None:
@@ -243,9 +536,11 @@ def _parse_speak_answer(block: dict) -> str | None:
         if not isinstance(rc, dict) or rc.get("type") != "text":
             continue
         try:
-            resp = json.loads(rc.get("text", "{}"))
+            resp = _json_loads(rc.get("text", "{}"))
         except json.JSONDecodeError:
             continue
+        if not isinstance(resp, dict):
+            continue
         if resp.get("cancelled") and len(resp) <= 2:
             return "[Cancelled]"
         if resp.get("confirmed") and len(resp) <= 2:
@@ -293,6 +588,929 @@ def parse_timestamp(ts: str) -> datetime | None:
         return None
 
 
+def message_time(msg: dict) -> datetime | None:
+    """Parsed timestamp of a message, cached on the record under "_ts"."""
+    if "_ts" not in msg:
+        msg["_ts"] = parse_timestamp(msg.get("timestamp", ""))
+    return msg["_ts"]
+
+
+def public_fields(msg: dict) -> dict:
+    """Copy of a message without private cache keys, for JSON output."""
+    return {k: v for k, v in msg.items() if not k.startswith("_")}
+
+
+# ── Persistent Index ─────────────────────────────────────────
+
+INDEX_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS files (
+        id INTEGER PRIMARY KEY,
+        path TEXT UNIQUE NOT NULL,
+        size INTEGER NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        offset INTEGER NOT NULL,
+        line_count INTEGER NOT NULL,
+        head_hash TEXT NOT NULL,
+        speak_state TEXT NOT NULL DEFAULT '{}',
+        tail_end INTEGER NOT NULL DEFAULT 0,
+        dev INTEGER NOT NULL DEFAULT 0,
+        inode INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE INDEX IF NOT EXISTS idx_files_inode ON files(inode);
+    CREATE TABLE IF NOT EXISTS messages (
+        id INTEGER PRIMARY KEY,
+        file_id INTEGER NOT NULL REFERENCES files(id),
+        source_line INTEGER NOT NULL,
+        type TEXT NOT NULL,
+        uuid TEXT,
+        timestamp TEXT,
+        session_id TEXT,
+        content TEXT NOT NULL,
+        is_speak_mcp INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE INDEX IF NOT EXISTS idx_messages_file ON messages(file_id);
+    CREATE TABLE IF NOT EXISTS dialogs (
+        message_id INTEGER PRIMARY KEY REFERENCES messages(id),
+        tool_use_id TEXT NOT NULL,
+        question TEXT NOT NULL,
+        answer TEXT NOT NULL,
+        question_line INTEGER NOT NULL
+    );
+    CREATE TRIGGER IF NOT EXISTS dialogs_ad AFTER DELETE ON messages BEGIN
+        DELETE FROM dialogs WHERE message_id = OLD.id;
+    END;
+    CREATE TABLE IF NOT EXISTS catalogue (
+        project_dir TEXT PRIMARY KEY,
+        index_mtime_ns INTEGER NOT NULL,
+        project_path TEXT,
+        newest_ms REAL,
+        entries TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_catalogue_path ON catalogue(project_path);
+    CREATE TABLE IF NOT EXISTS day_rollups (
+        file_id INTEGER NOT NULL REFERENCES files(id),
+        day TEXT NOT NULL,
+        message_count INTEGER NOT NULL,
+        user_count INTEGER NOT NULL,
+        sessions TEXT NOT NULL,
+        windows TEXT NOT NULL,
+        activities TEXT NOT NULL,
+        PRIMARY KEY (file_id, day)
+    );
+    CREATE INDEX IF NOT EXISTS idx_day_rollups_day ON day_rollups(day);
+    CREATE TABLE IF NOT EXISTS embeddings (
+        message_id INTEGER PRIMARY KEY,
+        row INTEGER NOT NULL,
+        bucket INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_embeddings_bucket ON embeddings(bucket);
+    CREATE TRIGGER IF NOT EXISTS embeddings_ad AFTER DELETE ON messages BEGIN
+        DELETE FROM embeddings WHERE message_id = OLD.id;
+    END;
+    CREATE TABLE IF NOT EXISTS meta (
+        key TEXT PRIMARY KEY,
+        value NOT NULL
+    );
+"""
+
+# External-content FTS5 table kept in sync with messages by triggers
+FTS_SCHEMA = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+        content, content='messages', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    );
+    CREATE TRIGGER IF NOT EXISTS messages_ai AFTER INSERT ON messages BEGIN
+        INSERT INTO messages_fts(rowid, content) VALUES (NEW.id, NEW.content);
+    END;
+    CREATE TRIGGER IF NOT EXISTS messages_ad AFTER DELETE ON messages BEGIN
+        INSERT INTO messages_fts(messages_fts, rowid, content)
+        VALUES ('delete', OLD.id, OLD.content);
+    END;
+"""
+INDEX_TABLES = ("messages_fts", "dialogs", "day_rollups", "embeddings", "messages", "files", "catalogue", "meta")
+
+
+def _head_hash(session_file: Path, length: int) -> str:
+    with open(session_file, "rb") as f:
+        return hashlib.sha1(f.read(length)).hexdigest()
+
+
+class MessageIndex:
+    """Incremental SQLite index of session messages.
+
+    Each file is tracked by size, mtime and the byte offset parsed so far, so
+    a refresh only decodes lines appended since the previous run.
+    """
+
+    def __init__(self, db_path: Path = INDEX_DB):
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(db_path), timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] != INDEX_VERSION:
+            for table in INDEX_TABLES:
+                self.conn.execute(f"DROP TABLE IF EXISTS {table}")
+            self.conn.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+        self.conn.executescript(INDEX_SCHEMA)
+        try:
+            self.conn.executescript(FTS_SCHEMA)
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5: substring search still works
+            self.has_fts = False
+        self.catalogue = ProjectCatalogue(self.conn)
+        self._canonical: dict[str, Path] = {}
+
+    def close(self):
+        self.conn.close()
+
+    def canonical_path(self, session_file: Path) -> Path:
+        """Path under which session_file's inode is indexed; itself if not yet indexed.
+
+        A session reached through two paths (a symlink, a hard link or a
+        differently spelled fullPath) is then parsed and stored once, and its
+        records are shared by every scope that lists it.
+        """
+        key = str(session_file)
+        if key in self._canonical:
+            return self._canonical[key]
+        canonical = session_file
+        try:
+            st = session_file.stat()
+        except OSError:
+            st = None
+        if st is not None and self.conn.execute(
+            "SELECT 1 FROM files WHERE path = ?", (key,)
+        ).fetchone() is None:
+            for (path,) in self.conn.execute(
+                "SELECT path FROM files WHERE inode = ? AND dev = ?", (st.st_ino, st.st_dev)
+            ).fetchall():
+                try:
+                    other = os.stat(path)
+                except OSError:
+                    continue
+                if (other.st_dev, other.st_ino) == (st.st_dev, st.st_ino):
+                    canonical = Path(path)
+                    break
+        self._canonical[key] = canonical
+        return canonical
+
+    def _plan(self, session_file: Path, st: os.stat_result) -> tuple | None:
+        """Resume state for a stale file, or None when the index is current."""
+        row = self.conn.execute(
+            "SELECT id, size, mtime_ns, offset, line_count, head_hash, speak_state, tail_end "
+            "FROM files WHERE path = ?", (str(session_file),)
+        ).fetchone()
+        if row is None:
+            return None, st, 0, 0, {}
+        file_id, size, mtime_ns, offset, line_count, head_hash, speak_state, tail_end = row
+        if size == st.st_size and mtime_ns == st.st_mtime_ns:
+            return None
+        head_len = min(offset, HEAD_HASH_BYTES)
+        # An unterminated last line was indexed as read; once the file moves on
+        # it may have been completed, so the file is reparsed rather than resumed
+        if not tail_end and st.st_size >= offset and _head_hash(session_file, head_len) == head_hash:
+            return file_id, st, offset, line_count, json.loads(speak_state)
+        self.conn.execute("DELETE FROM messages WHERE file_id = ?", (file_id,))
+        self.conn.execute("DELETE FROM day_rollups WHERE file_id = ?", (file_id,))
+        return file_id, st, 0, 0, {}
+
+    def _store(self, session_file: Path, plan: tuple, parsed: tuple):
+        file_id, st, _, _, _ = plan
+        new_messages, offset, line_count, speak_state, dialogs, tail_end = parsed
+        head_hash = _head_hash(session_file, min(offset, HEAD_HASH_BYTES))
+        if file_id is None:
+            file_id = self.conn.execute(
+                "INSERT INTO files (path, size, mtime_ns, offset, line_count, head_hash, "
+                "speak_state, tail_end, dev, inode) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (str(session_file), st.st_size, st.st_mtime_ns, offset, line_count, head_hash,
+                 json.dumps(speak_state), tail_end, st.st_dev, st.st_ino),
+            ).lastrowid
+        else:
+            self.conn.execute(
+                "UPDATE files SET size = ?, mtime_ns = ?, offset = ?, line_count = ?, "
+                "head_hash = ?, speak_state = ?, tail_end = ?, dev = ?, inode = ? WHERE id = ?",
+                (st.st_size, st.st_mtime_ns, offset, line_count, head_hash,
+                 json.dumps(speak_state), tail_end, st.st_dev, st.st_ino, file_id),
+            )
+        # Explicit ids let dialog rows reference the messages inserted with them
+        first_id = self.conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM messages").fetchone()[0]
+        self.conn.executemany(
+            "INSERT INTO messages (id, file_id, source_line, type, uuid, timestamp, session_id, "
+            "content, is_speak_mcp) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (first_id + i, file_id, m["source_line"], m["type"], m["uuid"], m["timestamp"],
+                 m["session_id"], m["content"], int(m.get("is_speak_mcp", False)))
+                for i, m in enumerate(new_messages)
+            ],
+        )
+        self.conn.executemany(
+            "INSERT INTO dialogs (message_id, tool_use_id, question, answer, question_line) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [(first_id + i, tool_id, question, answer, question_line)
+             for i, tool_id, question, answer, question_line in dialogs],
+        )
+        self._store_rollups(file_id, new_messages)
+
+    def _store_rollups(self, file_id: int, new_messages: list[dict]):
+        """Fold appended messages into the file's per-day rollups."""
+        keys = [m["timestamp"][:10] for m in new_messages if message_time(m)]
+        if not keys:
+            return
+        rows = self.conn.execute(
+            "SELECT day, message_count, user_count, sessions, windows, activities "
+            "FROM day_rollups WHERE file_id = ? AND day BETWEEN ? AND ?",
+            (file_id, min(keys), max(keys)),
+        )
+        days = summarise_days(new_messages, {row[0]: _rollup_from_row(row[1:]) for row in rows})
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO day_rollups (file_id, day, message_count, user_count, "
+            "sessions, windows, activities) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(file_id, key, *_rollup_to_row(day)) for key, day in days.items()],
+        )
+
+    def activity_days(self, session_files: list[Path] | None = None) -> dict[str, dict]:
+        """Per-day activity summaries of session_files, read from the rollups.
+
+        Cost follows the number of (session, day) pairs, not message count.
+        Run refresh_many() first so the rollups cover appended lines.
+        """
+        days: dict[str, dict] = {}
+        rows = self.conn.execute(
+            "SELECT r.day, r.message_count, r.user_count, r.sessions, r.windows, r.activities "
+            "FROM day_rollups r JOIN files f ON f.id = r.file_id "
+            f"WHERE {self._scope_filter(session_files)} ORDER BY r.day, f.path"
+        )
+        for row in rows:
+            merge_days(days, {row[0]: _rollup_from_row(row[1:])})
+        return days
+
+    def refresh(self, session_file: Path) -> int:
+        """Index bytes appended to session_file since the last run."""
+        return self.refresh_many([session_file])
+
+    def refresh_many(self, session_files: list[Path], jobs: int = 1) -> int:
+        """Index appended bytes for many files, parsing in up to jobs processes.
+
+        Returns the number of new messages. Truncated or rewritten files
+        (detected by size or a hash of the already-parsed head) are reparsed.
+        Workers only parse; all writes happen here, in input order. Paths
+        sharing an inode are parsed once, under the first one seen.
+        """
+        stale = []
+        by_inode: dict[tuple[int, int], Path] = {}
+        for path in session_files:
+            sf = self.canonical_path(path)
+            try:
+                st = sf.stat()
+            except OSError:
+                continue
+            first = by_inode.setdefault((st.st_dev, st.st_ino), sf)
+            if first != sf:
+                self._canonical[str(path)] = first
+                continue
+            plan = self._plan(sf, st)
+            if plan is not None:
+                stale.append((sf, plan))
+        if not stale:
+            return 0
+
+        work = [(sf, plan[2], plan[3], plan[4]) for sf, plan in stale]
+        with worker_pool(jobs, len(work)) as pool:
+            results = pool.map(_parse_tail_job, work, chunksize=_chunksize(len(work), jobs))
+            new_count = 0
+            for (sf, plan), parsed in zip(stale, results):
+                self._store(sf, plan, parsed)
+                new_count += len(parsed[0])
+        self.conn.commit()
+        return new_count
+
+    def iter_messages(self, session_file: Path, contains: str | None = None) -> Iterator[dict]:
+        """Stream indexed messages for a file in original line order.
+
+        contains narrows rows with a case-insensitive LIKE; SQLite only folds
+        ASCII case, so callers must still confirm matches themselves.
+        """
+        path = str(session_file)
+        sql = (
+            "SELECT m.type, m.uuid, m.timestamp, m.content, m.session_id, m.source_line, "
+            "m.is_speak_mcp FROM messages m JOIN files f ON f.id = m.file_id WHERE f.path = ?"
+        )
+        params: list = [str(self.canonical_path(session_file))]
+        if contains is not None:
+            sql += " AND m.content LIKE ? ESCAPE '\\'"
+            params.append(_like_pattern(contains))
+        sql += " ORDER BY m.id"
+        for row in self.conn.execute(sql, params):
+            yield _row_message(path, row)
+
+    def iter_dialogs(self, session_file: Path, contains: str | None = None) -> Iterator[dict]:
+        """Stream indexed speak MCP dialogs for a file, with "question" and "answer".
+
+        contains narrows rows like iter_messages(); callers confirm matches.
+        """
+        path = str(session_file)
+        sql = (
+            "SELECT m.type, m.uuid, m.timestamp, m.content, m.session_id, m.source_line, "
+            "m.is_speak_mcp, d.question, d.answer FROM dialogs d "
+            "JOIN messages m ON m.id = d.message_id JOIN files f ON f.id = m.file_id WHERE f.path = ?"
+        )
+        params: list = [str(self.canonical_path(session_file))]
+        if contains is not None:
+            sql += " AND m.content LIKE ? ESCAPE '\\'"
+            params.append(_like_pattern(contains))
+        for row in self.conn.execute(sql + " ORDER BY m.id", params):
+            msg = _row_message(path, row[:7])
+            msg["question"], msg["answer"] = row[7], row[8]
+            yield msg
+
+    def messages(self, session_file: Path) -> list[dict]:
+        """Return indexed messages for a file in original line order."""
+        return list(self.iter_messages(session_file))
+
+    def _scope_filter(self, session_files: list[Path] | None) -> str:
+        """SQL condition limiting f.path to session_files (every file when None)."""
+        if session_files is None:
+            return "1"
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS scope (path TEXT PRIMARY KEY)")
+        self.conn.execute("DELETE FROM temp.scope")
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO temp.scope (path) VALUES (?)",
+            [(str(self.canonical_path(sf)),) for sf in session_files],
+        )
+        return "f.path IN (SELECT path FROM temp.scope)"
+
+    def search_text(
+        self,
+        query: str,
+        session_files: list[Path] | None = None,
+        limit: int | None = None,
+        dialogs_only: bool = False,
+    ) -> list[dict]:
+        """Case-insensitive substring matches in file and line order.
+
+        dialogs_only keeps speak MCP dialogs, with "question" and "answer".
+        """
+        regex = re.compile(re.escape(query), re.IGNORECASE)
+        join = "JOIN dialogs d ON d.message_id = m.id" if dialogs_only else ""
+        extra = ", d.question, d.answer" if dialogs_only else ""
+        sql = (
+            "SELECT m.type, m.uuid, m.timestamp, m.content, m.session_id, m.source_line, "
+            f"m.is_speak_mcp, f.path{extra} FROM messages m JOIN files f ON f.id = m.file_id {join} "
+            f"WHERE {self._scope_filter(session_files)}"
+        )
+        params: list = []
+        if query.isascii():
+            sql += " AND m.content LIKE ? ESCAPE '\\'"
+            params.append(_like_pattern(query))
+        results = []
+        for row in self.conn.execute(sql + " ORDER BY m.file_id, m.id", params):
+            if regex.search(row[3]):
+                msg = _row_message(row[7], row[:7])
+                if dialogs_only:
+                    msg["question"], msg["answer"] = row[8], row[9]
+                results.append(msg)
+                if limit is not None and len(results) >= limit:
+                    break
+        return results
+
+    def search_ranked(
+        self,
+        session_files: list[Path] | None,
+        fts_query: str,
+        limit: int | None = None,
+    ) -> list[dict]:
+        """Full-text matches within session_files, best bm25 score first.
+
+        fts_query terms are ANDed; "quoted phrases" and prefix* terms are
+        supported and other tokens are matched as plain text (see
+        fts_match_expr). Each message gets a "score" (higher is more
+        relevant). Cost follows the number of hits, not history size.
+        """
+        if not self.has_fts:
+            raise sqlite3.OperationalError("SQLite was built without FTS5")
+        rows = self.conn.execute(
+            "SELECT m.type, m.uuid, m.timestamp, m.content, m.session_id, m.source_line, "
+            "m.is_speak_mcp, f.path, bm25(messages_fts) AS score "
+            "FROM messages_fts JOIN messages m ON m.id = messages_fts.rowid "
+            "JOIN files f ON f.id = m.file_id "
+            f"WHERE messages_fts MATCH ? AND {self._scope_filter(session_files)} "
+            "ORDER BY score LIMIT ?",
+            (fts_match_expr(fts_query), -1 if limit is None else limit),
+        )
+        results = []
+        for row in rows:
+            msg = _row_message(row[7], row[:7])
+            msg["score"] = round(-row[8], 4)
+            results.append(msg)
+        return results
+
+
+def _rollup_from_row(row: tuple) -> dict:
+    message_count, user_count, sessions, windows, activities = row
+    return {
+        "messages": message_count,
+        "user_messages": user_count,
+        "sessions": set(json.loads(sessions)),
+        "windows": [[datetime.fromisoformat(s), datetime.fromisoformat(e)] for s, e in json.loads(windows)],
+        "activities": [(datetime.fromisoformat(ts), label) for ts, label in json.loads(activities)],
+    }
+
+
+def _rollup_to_row(day: dict) -> tuple:
+    return (
+        day["messages"],
+        day["user_messages"],
+        json.dumps(sorted(day["sessions"])),
+        json.dumps([[s.isoformat(), e.isoformat()] for s, e in day["windows"]]),
+        json.dumps([[ts.isoformat(), label] for ts, label in day["activities"]]),
+    )
+
+
+_FTS_TERM = re.compile(r'"([^"]*)"(\*?)|([^\s"]+)')
+
+
+def fts_match_expr(query: str) -> str:
+    """Turn a --ranked query into an FTS5 MATCH expression.
+
+    "quoted phrases" and prefix* terms keep their meaning; every other token
+    is quoted, so identifiers like foo-bar or a.b:c are searched as text
+    instead of being read as FTS5 operators or column filters.
+    """
+    terms = []
+    for m in _FTS_TERM.finditer(query):
+        phrase, phrase_star, bare = m.groups()
+        if bare is None:
+            text, star = phrase, phrase_star
+        elif bare.endswith("*") and bare.rstrip("*"):
+            text, star = bare.rstrip("*"), "*"
+        else:
+            text, star = bare, ""
+        terms.append('"' + text.replace('"', '""') + '"' + star)
+    return " ".join(terms) or '""'
+
+
+def _like_pattern(text: str) -> str:
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _row_message(path: str, row: tuple) -> dict:
+    type_, uuid, timestamp, content, session_id, source_line, is_speak = row
+    msg = {
+        "type": type_,
+        "uuid": uuid,
+        "timestamp": timestamp,
+        "content": content,
+        "session_id": session_id,
+        "source_file": path,
+        "source_line": source_line,
+    }
+    if is_speak:
+        msg["is_speak_mcp"] = True
+    return msg
+
+
+class ProjectCatalogue:
+    """Cached copy of every project's sessions-index.json.
+
+    Rows are invalidated per file by mtime. A project directory's
+    projectPath never changes, so --folder narrows candidates with a range
+    scan on the cached path before anything is stat'ed or decoded. Only
+    session paths and mtimes are kept from each entry.
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def _sync_dirs(self):
+        """Track project dirs added or removed since the last listing."""
+        try:
+            mtime_ns = PROJECTS_DIR.stat().st_mtime_ns
+        except OSError:
+            return
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'projects_mtime_ns'").fetchone()
+        if row and row[0] == mtime_ns:
+            return
+        current = {
+            str(d) for d in PROJECTS_DIR.iterdir()
+            if d.is_dir() and "_archive" not in d.parts
+        }
+        known = {r[0] for r in self.conn.execute("SELECT project_dir FROM catalogue")}
+        self.conn.executemany(
+            "DELETE FROM catalogue WHERE project_dir = ?", [(d,) for d in known - current],
+        )
+        self.conn.executemany(
+            "INSERT INTO catalogue (project_dir, index_mtime_ns) VALUES (?, -1)",
+            [(d,) for d in current - known],
+        )
+        self.conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('projects_mtime_ns', ?)", (mtime_ns,),
+        )
+
+    def _refresh_row(self, project_dir: str, cached_mtime_ns: int) -> bool:
+        """Re-read a project's sessions-index.json if it changed; True if usable."""
+        index_file = Path(project_dir) / "sessions-index.json"
+        try:
+            mtime_ns = index_file.stat().st_mtime_ns
+        except OSError:
+            mtime_ns = -1
+        if mtime_ns == cached_mtime_ns:
+            return mtime_ns != -1
+        loaded = read_sessions_index(index_file) if mtime_ns != -1 else None
+        if loaded is None:
+            self.conn.execute(
+                "UPDATE catalogue SET index_mtime_ns = ?, project_path = NULL, newest_ms = NULL, "
+                "entries = NULL WHERE project_dir = ?", (mtime_ns, project_dir),
+            )
+            return False
+        project_path, entries = loaded
+        compact = [
+            {"fullPath": e["fullPath"], "fileMtime": e.get("fileMtime", 0)}
+            for e in entries if "fullPath" in e
+        ]
+        self.conn.execute(
+            "UPDATE catalogue SET index_mtime_ns = ?, project_path = ?, newest_ms = ?, entries = ? "
+            "WHERE project_dir = ?",
+            (mtime_ns, project_path, max((e["fileMtime"] for e in compact), default=0),
+             json.dumps(compact, separators=(",", ":")), project_dir),
+        )
+        return True
+
+    def lookup(self, folder: str | None = None, cutoff_ms: float | None = None) -> list[dict]:
+        """Projects whose path starts with folder, entries modified after cutoff_ms."""
+        self._sync_dirs()
+        prefix_sql, prefix = "1", []
+        if folder:
+            prefix_sql = "project_path >= ? AND project_path < ?"
+            prefix = [folder, folder[:-1] + chr(ord(folder[-1]) + 1)]
+        stale = self.conn.execute(
+            "SELECT project_dir, index_mtime_ns FROM catalogue "
+            f"WHERE project_path IS NULL OR ({prefix_sql})", prefix,
+        ).fetchall()
+        for project_dir, mtime_ns in stale:
+            self._refresh_row(project_dir, mtime_ns)
+        self.conn.commit()
+
+        sql = f"SELECT project_dir, project_path, entries FROM catalogue WHERE entries IS NOT NULL AND {prefix_sql}"
+        params = list(prefix)
+        if cutoff_ms:
+            sql += " AND newest_ms >= ?"
+            params.append(cutoff_ms)
+        results = []
+        for project_dir, project_path, entries_json in self.conn.execute(sql + " ORDER BY project_path", params):
+            entries = json.loads(entries_json)
+            if cutoff_ms:
+                entries = [e for e in entries if e["fileMtime"] >= cutoff_ms]
+            if entries:
+                results.append({
+                    "project_dir": Path(project_dir),
+                    "project_path": project_path,
+                    "session_entries": entries,
+                })
+        return results
+
+
+def open_index(args) -> MessageIndex | None:
+    """Open the persistent index unless --no-index was given."""
+    if getattr(args, "no_index", False):
+        return None
+    try:
+        return MessageIndex()
+    except (sqlite3.Error, OSError) as e:
+        print(f"Warning: index unavailable ({e}), parsing session files directly", file=sys.stderr)
+        return None
+
+
+def _file_key(session_file: Path) -> tuple | Path:
+    """Content-addressed identity (dev, inode, size, mtime_ns); the path if unreadable."""
+    try:
+        st = session_file.stat()
+    except OSError:
+        return session_file
+    return st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def iter_session_messages(
+    session_files: list[Path],
+    index: MessageIndex | None,
+    jobs: int = 1,
+) -> Iterator[list[dict]]:
+    """Yield messages per session file in input order, parsing across jobs processes.
+
+    A file listed more than once, under any path, is parsed once and its
+    record list shared; it is kept only until its last listing is yielded.
+    """
+    keys = [_file_key(sf) for sf in session_files]
+    first: dict = {}
+    for sf, key in zip(session_files, keys):
+        first.setdefault(key, sf)
+    unique = list(first.values())
+    if index is not None:
+        index.refresh_many(unique, jobs)
+        parsed = map(index.messages, unique)
+        pool = None
+    else:
+        pool = worker_pool(jobs, len(unique))
+        parsed = pool.map(extract_messages, unique, chunksize=_chunksize(len(unique), jobs))
+    try:
+        remaining = collections.Counter(keys)
+        shared: dict = {}
+        for key in keys:
+            if key not in shared:
+                # First listings come in the same order as unique
+                shared[key] = next(parsed)
+            remaining[key] -= 1
+            yield shared[key] if remaining[key] else shared.pop(key)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+
+def iter_project_messages(
+    projects: list[dict],
+    args,
+    index: MessageIndex | None,
+) -> Iterator[tuple[dict, int, list[dict]]]:
+    """Yield (project, session_count, messages) for each project in scope.
+
+    Session files of all projects are fanned out over one worker pool and
+    merged back per project in discovery order, so output matches a serial run.
+    """
+    since = getattr(args, "since", None)
+    scoped = [
+        (proj, list(iter_sessions_for_project(proj, since, args.include_agents)))
+        for proj in projects
+    ]
+    per_file = iter_session_messages(
+        [sf for _, files in scoped for sf in files], index, getattr(args, "jobs", 1),
+    )
+    for proj, files in scoped:
+        messages = []
+        for _ in files:
+            messages.extend(next(per_file))
+        yield proj, len(files), messages
+
+
+# ── Semantic Search ──────────────────────────────────────────
+
+VECTORS_FILE = INDEX_DB.with_name("vectors.f32")
+EMBED_BATCH = 256
+EMBED_CHARS = 2000  # only the head of long messages is embedded
+LSH_BITS = 12
+SEMANTIC_LIMIT = 20
+SEMANTIC_CANDIDATES = 4096  # vectors reranked exactly per query
+WORD_RE = re.compile(r"\w{3,}")
+
+
+class HashedNgramEmbedder:
+    """Dependency-free embedding by signed feature hashing.
+
+    Each word and its character trigrams are hashed with crc32 (stable
+    across runs) into a fixed-size vector, so inflections and typos land
+    near each other. Word features are memoised, which makes a message cost
+    about one dict lookup per distinct word.
+    """
+
+    name = "hashed-ngram-v1"
+    dim = 256
+
+    def __init__(self):
+        self._features = functools.lru_cache(maxsize=1 << 16)(self._word_features)
+
+    def _word_features(self, word: str) -> tuple[tuple[int, float], ...]:
+        padded = f"<{word}>"
+        grams = [(word, 1.0)] + [(padded[i:i + 3], 0.5) for i in range(len(padded) - 2)]
+        features = []
+        for gram, weight in grams:
+            h = zlib.crc32(gram.encode())
+            features.append((h % self.dim, weight if h & 0x80000000 else -weight))
+        return tuple(features)
+
+    def embed(self, texts: list[str]) -> list[array]:
+        vectors = []
+        for text in texts:
+            vec = [0.0] * self.dim
+            counts: dict[str, int] = {}
+            for word in WORD_RE.findall(text[:EMBED_CHARS].lower()):
+                counts[word] = counts.get(word, 0) + 1
+            for word, count in counts.items():
+                tf = 1.0 + math.log(count)
+                for i, weight in self._features(word):
+                    vec[i] += weight * tf
+            norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+            vectors.append(array("f", [v / norm for v in vec]))
+        return vectors
+
+
+class ModelEmbedder:
+    """A sentence-transformers model run on CPU (optional dependency)."""
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.name = f"st:{model_name}"
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def embed(self, texts: list[str]) -> list[array]:
+        matrix = self.model.encode(
+            [t[:EMBED_CHARS] for t in texts], batch_size=64,
+            normalize_embeddings=True, convert_to_numpy=True,
+        )
+        return [array("f", row.astype("float32").tobytes()) for row in matrix]
+
+
+def make_embedder(model_name: str | None = None) -> HashedNgramEmbedder | ModelEmbedder:
+    """The named sentence-transformers model, or hashed n-grams without one."""
+    if model_name is None:
+        return HashedNgramEmbedder()
+    if importlib.util.find_spec("sentence_transformers") is None:
+        print("Warning: sentence-transformers not installed, using hashed n-gram embeddings",
+              file=sys.stderr)
+        return HashedNgramEmbedder()
+    return ModelEmbedder(model_name)
+
+
+class VectorIndex:
+    """Message embeddings in a memory-mapped float32 matrix next to the index.
+
+    Row i of the vectors file is a unit vector; the embeddings table maps
+    message ids to rows and to an LSH bucket (the signs of LSH_BITS random
+    hyperplane projections). A query probes buckets near its own and
+    reranks those candidates by exact cosine.
+    Messages are embedded once, in batches, the first time a search covers
+    them. Rows of deleted messages stay in the file until it is rebuilt.
+    Each batch is appended at the file's end while holding the SQLite write
+    lock, so concurrent writers (a search and the watch daemon) never number
+    two vectors alike.
+    """
+
+    def __init__(self, index: MessageIndex, embedder, path: Path = VECTORS_FILE):
+        self.index = index
+        self.conn = index.conn
+        self.embedder = embedder
+        self.path = path
+        self.dim = embedder.dim
+        rng = random.Random(f"{embedder.name}:{embedder.dim}")
+        self.planes = [[rng.gauss(0.0, 1.0) for _ in range(self.dim)] for _ in range(LSH_BITS)]
+        self.row_bytes = self.dim * 4
+        self._check_embedder()
+
+    def _check_embedder(self) -> None:
+        """Drop every vector when the embedder (name or dimension) changed."""
+        key = f"{self.embedder.name}:{self.dim}"
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'embedder'").fetchone()
+        if row is not None and row[0] == key:
+            return
+        with self._write_lock():
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'embedder'").fetchone()
+            if row is None or row[0] != key:
+                self.conn.execute("DELETE FROM embeddings")
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('embedder', ?)", (key,),
+                )
+                with open(self.path, "ab") as f:
+                    f.truncate(0)
+
+    @contextmanager
+    def _write_lock(self) -> Iterator[None]:
+        """Hold the database write lock; commit on success, roll back on error."""
+        if self.conn.in_transaction:
+            # Only temp scope rows can be pending here; BEGIN cannot nest
+            self.conn.commit()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.conn.rollback()
+            raise
+        self.conn.commit()
+
+    def _append(self, batch: list[tuple[int, str]], vectors: list[array]) -> None:
+        """Append vectors for batch and record their rows in one write transaction.
+
+        Rows are numbered from the file's end, rounded up to a whole row in
+        case an interrupted writer left a partial one. Messages another
+        process embedded meanwhile are skipped.
+        """
+        with self._write_lock():
+            ids = [mid for mid, _ in batch]
+            done = {r[0] for r in self.conn.execute(
+                f"SELECT message_id FROM embeddings WHERE message_id IN ({','.join('?' * len(ids))})",
+                ids,
+            )}
+            pending = [(mid, vec) for (mid, _), vec in zip(batch, vectors) if mid not in done]
+            if not pending:
+                return
+            with open(self.path, "ab") as f:
+                first = -(-f.seek(0, os.SEEK_END) // self.row_bytes)
+                f.truncate(first * self.row_bytes)
+                f.write(b"".join(vec.tobytes() for _, vec in pending))
+                # Vectors must be on disk before the rows pointing at them commit
+                f.flush()
+            self.conn.executemany(
+                "INSERT INTO embeddings (message_id, row, bucket) VALUES (?, ?, ?)",
+                [(mid, first + i, self._bucket(vec)) for i, (mid, vec) in enumerate(pending)],
+            )
+
+    def _bucket(self, vec: array) -> int:
+        bucket = 0
+        for bit, plane in enumerate(self.planes):
+            if sum(map(operator.mul, plane, vec)) >= 0:
+                bucket |= 1 << bit
+        return bucket
+
+    def update(self, session_files: list[Path] | None = None) -> int:
+        """Embed indexed messages in session_files that have no vector yet."""
+        ids = [r[0] for r in self.conn.execute(
+            "SELECT m.id FROM messages m JOIN files f ON f.id = m.file_id "
+            "LEFT JOIN embeddings e ON e.message_id = m.id "
+            f"WHERE e.message_id IS NULL AND {self.index._scope_filter(session_files)} ORDER BY m.id"
+        )]
+        for start in range(0, len(ids), EMBED_BATCH):
+            chunk = ids[start:start + EMBED_BATCH]
+            batch = self.conn.execute(
+                f"SELECT id, content FROM messages WHERE id IN ({','.join('?' * len(chunk))}) "
+                "ORDER BY id", chunk,
+            ).fetchall()
+            # Embedding runs outside the lock; only the append holds it
+            self._append(batch, self.embedder.embed([content for _, content in batch]))
+        return len(ids)
+
+    def _scores(self, query_vec: array, rows: list[int]) -> list[float]:
+        """Cosine similarity of query_vec with each matrix row (NumPy when installed).
+
+        Only whole rows are viewed: a concurrent or interrupted append may
+        leave a partial row at the end, which no committed row points into.
+        """
+        with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            whole = len(mm) // self.row_bytes * self.dim
+            if importlib.util.find_spec("numpy") is not None:
+                import numpy as np
+
+                matrix = np.frombuffer(mm, dtype=np.float32, count=whole).reshape(-1, self.dim)
+                scores = (matrix[rows] @ np.asarray(query_vec, dtype=np.float32)).tolist()
+                del matrix  # release the buffer before the map closes
+                return scores
+            with memoryview(mm) as raw, raw[:whole * 4] as rows_view, rows_view.cast("f") as view:
+                return [
+                    sum(map(operator.mul, query_vec, view[r * self.dim:(r + 1) * self.dim]))
+                    for r in rows
+                ]
+
+    def search(
+        self,
+        session_files: list[Path] | None,
+        query: str,
+        limit: int = SEMANTIC_LIMIT,
+    ) -> list[dict]:
+        """Messages in session_files closest in meaning to query, best first.
+
+        Buckets are probed in rings of growing Hamming distance until at
+        least SEMANTIC_CANDIDATES messages are found, which bounds rerank
+        cost on large histories and degrades to an exact scan on small ones.
+        Each message gets a "score" (cosine similarity, higher is closer).
+        """
+        query_vec = self.embedder.embed([query])[0]
+        bucket = self._bucket(query_vec)
+        sql = (
+            "SELECT e.row, e.message_id FROM embeddings e JOIN messages m ON m.id = e.message_id "
+            f"JOIN files f ON f.id = m.file_id WHERE {self.index._scope_filter(session_files)} "
+            "AND e.bucket IN "
+        )
+        candidates = []
+        for radius in range(LSH_BITS + 1):
+            ring = [
+                bucket ^ sum(1 << bit for bit in bits)
+                for bits in combinations(range(LSH_BITS), radius)
+            ]
+            for start in range(0, len(ring), 500):
+                probes = ring[start:start + 500]
+                candidates += self.conn.execute(
+                    sql + f"({','.join('?' * len(probes))})", probes,
+                ).fetchall()
+            if len(candidates) >= SEMANTIC_CANDIDATES:
+                break
+        if not candidates:
+            return []
+
+        scores = self._scores(query_vec, [row for row, _ in candidates])
+        best = heapq.nlargest(limit, zip(scores, (mid for _, mid in candidates)))
+        ids = [mid for _, mid in best]
+        rows = self.conn.execute(
+            "SELECT m.id, m.type, m.uuid, m.timestamp, m.content, m.session_id, m.source_line, "
+            "m.is_speak_mcp, f.path FROM messages m JOIN files f ON f.id = m.file_id "
+            f"WHERE m.id IN ({','.join('?' * len(ids))})", ids,
+        )
+        by_id = {row[0]: _row_message(row[8], row[1:8]) for row in rows}
+        results = []
+        for score, mid in best:
+            msg = by_id[mid]
+            msg["score"] = round(score, 4)
+            results.append(msg)
+        return results
+
+
 # ── Search & Time Windowing ──────────────────────────────────
 
 def search_messages(messages: list[dict], query: str) -> list[dict]:
@@ -300,12 +1518,84 @@ def search_messages(messages: list[dict], query: str) -> list[dict]:
     return [m for m in messages if regex.search(m["content"])]
 
 
+def _file_matches_job(job: tuple[Path, str, bool]) -> list[dict]:
+    return extract_messages(*job)
+
+
+def iter_matches(
+    session_files: list[Path],
+    query: str,
+    index: MessageIndex | None,
+    jobs: int = 1,
+    dialogs_only: bool = False,
+) -> Iterator[dict]:
+    """Stream matches in file order; stop consuming to stop reading.
+
+    dialogs_only restricts matches to speak MCP dialog records.
+    """
+    if index is not None:
+        index.refresh_many(session_files, jobs)
+        regex = re.compile(re.escape(query), re.IGNORECASE)
+        contains = query if query.isascii() else None
+        iter_rows = index.iter_dialogs if dialogs_only else index.iter_messages
+        for sf in session_files:
+            for msg in iter_rows(sf, contains):
+                if regex.search(msg["content"]):
+                    yield msg
+        return
+    if jobs == 1:
+        for sf in session_files:
+            yield from iter_file_messages(sf, query, dialogs_only)
+        return
+    pool = worker_pool(jobs, len(session_files))
+    try:
+        work = [(sf, query, dialogs_only) for sf in session_files]
+        for file_matches in pool.map(_file_matches_job, work):
+            yield from file_matches
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+
+def _window_messages_job(job: tuple[Path, list]) -> list[dict]:
+    session_file, windows = job
+    return extract_window_messages(extract_messages(session_file), windows)
+
+
+def collect_window_messages(
+    session_files: list[Path],
+    windows: list[tuple[datetime, datetime]],
+    index: MessageIndex | None,
+    jobs: int = 1,
+) -> list[dict]:
+    """Messages inside any window, read file by file, sorted by timestamp.
+
+    Files last modified before the first window opens cannot contain
+    messages inside it and are skipped.
+    """
+    if not windows:
+        return []
+    first_start = windows[0][0].timestamp()
+    candidates = [sf for sf in session_files if sf.stat().st_mtime >= first_start]
+    result = []
+    if index is not None:
+        for sf in candidates:
+            result.extend(extract_window_messages(index.iter_messages(sf), windows))
+    else:
+        with worker_pool(jobs, len(candidates)) as pool:
+            jobs_in = [(sf, windows) for sf in candidates]
+            for file_msgs in pool.map(_window_messages_job, jobs_in,
+                                      chunksize=_chunksize(len(jobs_in), jobs)):
+                result.extend(file_msgs)
+    result.sort(key=lambda m: m.get("timestamp", ""))
+    return result
+
+
 def build_time_windows(
     matches: list[dict],
     margin_minutes: int = 5,
     gap_minutes: int = 10,
 ) -> list[tuple[datetime, datetime]]:
-    timestamps = sorted(filter(None, (parse_timestamp(m["timestamp"]) for m in matches)))
+    timestamps = sorted(filter(None, (message_time(m) for m in matches)))
     if not timestamps:
         return []
 
@@ -328,21 +1618,82 @@ def build_time_windows(
 
 
 def extract_window_messages(
-    messages: list[dict],
+    messages: Iterable[dict],
     windows: list[tuple[datetime, datetime]],
 ) -> list[dict]:
+    """Messages inside any window.
+
+    Windows must be sorted and non-overlapping, as built by
+    build_time_windows(), so membership is a bisect over window starts.
+    """
+    starts = [s for s, _ in windows]
     result = []
     for msg in messages:
-        ts = parse_timestamp(msg["timestamp"])
+        ts = message_time(msg)
         if not ts:
             continue
-        for s, e in windows:
-            if s <= ts <= e:
-                result.append(msg)
-                break
+        i = bisect_right(starts, ts) - 1
+        if i >= 0 and ts <= windows[i][1]:
+            result.append(msg)
     return result
 
 
+def iter_project_matches(
+    projects: list[dict],
+    query: str,
+    args,
+    index: MessageIndex | None,
+) -> Iterator[tuple[dict, list[Path], list[dict]]]:
+    """Yield (project, session_files, matches) for each project in scope.
+
+    Substring matches stream per project until --limit is reached. Ranked
+    and semantic modes run one query over every project so the limit keeps
+    the globally best hits.
+    """
+    since = getattr(args, "since", None)
+    if getattr(args, "ranked", False) or getattr(args, "semantic", False):
+        scoped = [
+            (proj, list(iter_sessions_for_project(proj, since, args.include_agents)))
+            for proj in projects
+        ]
+        all_files = [sf for _, files in scoped for sf in files]
+        index.refresh_many(all_files, args.jobs)
+        if args.semantic:
+            vectors = VectorIndex(index, make_embedder(args.model))
+            vectors.update(all_files)
+            hits = vectors.search(all_files, query, args.limit or SEMANTIC_LIMIT)
+        else:
+            try:
+                hits = index.search_ranked(all_files, query, args.limit)
+            except sqlite3.OperationalError as e:
+                print(f"Error: invalid full-text query: {e}")
+                sys.exit(1)
+        # Hits carry the indexed (canonical) path; map them back to the path
+        # each project listed, as the substring path does
+        by_file: dict[str, list[dict]] = {}
+        for msg in hits:
+            by_file.setdefault(msg["source_file"], []).append(msg)
+        for proj, files in scoped:
+            yield proj, files, [
+                {**m, "source_file": str(sf)}
+                for sf in files
+                for m in by_file.get(str(index.canonical_path(sf)), [])
+            ]
+        return
+
+    remaining = args.limit
+    for proj in projects:
+        if remaining is not None and remaining <= 0:
+            break
+        session_files = list(iter_sessions_for_project(proj, since, args.include_agents))
+        matches = list(islice(
+            iter_matches(session_files, query, index, args.jobs, args.dialogs), remaining,
+        ))
+        if remaining is not None:
+            remaining -= len(matches)
+        yield proj, session_files, matches
+
+
 # ── Timeline Generation ──────────────────────────────────────
 
 def generate_timeline(matches: list[dict], windows: list[dict], query: str, project_label: str | None = None) -> str:
@@ -387,14 +1738,13 @@ def generate_timeline(matches: list[dict], windows: list[dict], query: str, proj
 
         lines.append(f"  {date_label}   ●{'━' * (w - 12)}●")
 
-        for window in sorted(day_windows, key=lambda x: x["start"]):
+        day_windows = sorted(day_windows, key=lambda x: x["start"])
+        for window, activities in zip(day_windows, _window_activities(day_matches, day_windows)):
             time_str = window["start"][11:16]
             dur = f"{window['duration_minutes']:.0f}m"
             lines.append(f"  {time_str}   │ {dur} session")
 
-            ws = datetime.fromisoformat(window["start"].replace("Z", "+00:00"))
-            we = datetime.fromisoformat(window["end"].replace("Z", "+00:00"))
-            for activity in _extract_activities(day_matches, ws, we)[:4]:
+            for activity in activities[:4]:
                 truncated = activity[: w - 14]
                 if len(activity) > w - 14:
                     truncated += "..."
@@ -406,31 +1756,60 @@ def generate_timeline(matches: list[dict], windows: list[dict], query: str, proj
     return "\n".join(lines)
 
 
-def _extract_activities(matches: list[dict], start: datetime, end: datetime) -> list[str]:
-    activities = []
-    seen: set[str] = set()
+def _window_activities(matches: list[dict], windows: list[dict]) -> list[list[str]]:
+    """Distinct activity labels per window, in match order.
+
+    Windows are sorted and non-overlapping, so each match is placed with one
+    bisect over window starts and labelled at most once.
+    """
+    bounds = [(parse_timestamp(w["start"]), parse_timestamp(w["end"])) for w in windows]
+    starts = [s for s, _ in bounds]
+    activities: list[list[str]] = [[] for _ in windows]
     for m in matches:
-        ts = parse_timestamp(m.get("timestamp", ""))
-        if not ts or not (start <= ts <= end):
+        ts = message_time(m)
+        if not ts:
+            continue
+        i = bisect_right(starts, ts) - 1
+        if i < 0 or ts > bounds[i][1]:
             continue
-        preview = m.get("preview", m.get("content", ""))[:100].replace("\n", " ").strip()
-        activity = _infer_activity(preview, m.get("type", ""))
-        if activity and activity not in seen:
-            seen.add(activity)
-            activities.append(activity)
+        activity = message_activity(m)
+        if activity and activity not in activities[i]:
+            activities[i].append(activity)
     return activities
 
 
+def message_activity(msg: dict) -> str | None:
+    """Inferred activity label of a message, cached on the record under "_activity"."""
+    if "_activity" not in msg:
+        preview = msg.get("preview", msg.get("content", ""))[:100].replace("\n", " ").strip()
+        msg["_activity"] = _infer_activity(preview, msg.get("type", ""))
+    return msg["_activity"]
+
+
+ACTIVITY_SKIP = (
+    "let me", "i'll ", "i will", "now let", "base directory",
+    "launching skill", "skill is running", "<bash-stdout>",
+    "i'm going to", "i need to",
+)
+ACTIVITY_PATTERNS = [
+    (re.compile(pattern), label)
+    for pattern, label in (
+        (r"created.*skill", "Created skill"),
+        (r"installed.*skill", "Installed skill"),
+        (r"skill.*created", "Skill created"),
+        (r"skill.*installed", "Skill installed"),
+        (r"done\.", "Task completed"),
+        (r"fixed", "Fixed issue"),
+        (r"updated", "Updated"),
+    )
+]
+
+
 def _infer_activity(preview: str, msg_type: str) -> str | None:
     preview_lower = preview.lower()
     preview_clean = preview.replace("\n", " ").strip()
 
-    skip = [
-        "let me", "i'll ", "i will", "now let", "base directory",
-        "launching skill", "skill is running", "<bash-stdout>",
-        "i'm going to", "i need to",
-    ]
-    if any(p in preview_lower for p in skip):
+    if any(p in preview_lower for p in ACTIVITY_SKIP):
         return None
 
     if msg_type == "user" and len(preview_clean) > 10:
@@ -440,66 +1819,348 @@ def _infer_activity(preview: str, msg_type: str) -> str | None:
         return clean + "..." if len(preview_clean) > 70 else clean
 
     if msg_type == "assistant":
-        patterns = [
-            (r"created.*skill", "Created skill"),
-            (r"installed.*skill", "Installed skill"),
-            (r"skill.*created", "Skill created"),
-            (r"skill.*installed", "Skill installed"),
-            (r"done\.", "Task completed"),
-            (r"fixed", "Fixed issue"),
-            (r"updated", "Updated"),
-        ]
-        for pattern, label in patterns:
-            if re.search(pattern, preview_lower):
+        for pattern, label in ACTIVITY_PATTERNS:
+            if pattern.search(preview_lower):
                 first_sentence = preview_clean.split(".")[0][:60]
                 return first_sentence if len(first_sentence) > 15 else label
 
     return None
 
 
-# ── Subcommand: search ───────────────────────────────────────
+ROLLUP_GAP_MINUTES = 10
+ROLLUP_ACTIVITIES = 8
 
-def cmd_search(args):
-    query = " ".join(args.query)
-    projects = resolve_projects(args)
-    if not projects:
-        print(f"Error: No projects found for scope")
-        sys.exit(1)
 
-    output_dir = Path(args.output) if args.output else None
-    all_results = []
+def _new_day() -> dict:
+    return {"messages": 0, "user_messages": 0, "sessions": set(), "windows": [], "activities": []}
+
+
+def _merge_windows(windows: list[list[datetime]], gap: timedelta) -> list[list[datetime]]:
+    merged: list[list[datetime]] = []
+    for start, end in sorted(windows):
+        if merged and start <= merged[-1][1] + gap:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
 
-    for proj in projects:
-        all_messages = []
-        for sf in iter_sessions_for_project(proj, getattr(args, "since", None)):
-            all_messages.extend(extract_messages(sf))
-        all_messages.sort(key=lambda m: m.get("timestamp", ""))
 
-        matches = search_messages(all_messages, query)
-        if not matches:
+def _add_activities(target: list[tuple[datetime, str]], items: Iterable[tuple[datetime, str]]):
+    """Keep the ROLLUP_ACTIVITIES earliest distinct labels, in time order.
+
+    The result does not depend on the order items arrive in, so appending to
+    stored rollups matches summarising the whole history at once.
+    """
+    for ts, label in items:
+        if len(target) >= ROLLUP_ACTIVITIES and ts >= target[-1][0]:
             continue
+        for i, (seen_ts, seen) in enumerate(target):
+            if seen == label:
+                if ts < seen_ts:
+                    target[i] = (ts, label)
+                break
+        else:
+            target.append((ts, label))
+        target.sort()
+        del target[ROLLUP_ACTIVITIES:]
 
-        windows = build_time_windows(matches, args.margin, args.gap)
-        context_messages = extract_window_messages(all_messages, windows)
 
-        result = {
-            "project": proj["project_path"],
+def summarise_days(messages: Iterable[dict], days: dict[str, dict] | None = None) -> dict[str, dict]:
+    """Fold messages into per-day activity summaries keyed by UTC date.
+
+    A summary holds message counts, session ids, activity windows (messages
+    at most ROLLUP_GAP_MINUTES apart share one) and the ROLLUP_ACTIVITIES
+    earliest distinct activity labels with their times. Pass days to extend earlier summaries, as the
+    index does for appended lines.
+    """
+    days = {} if days is None else days
+    gap = timedelta(minutes=ROLLUP_GAP_MINUTES)
+    touched = set()
+    for msg in messages:
+        ts = message_time(msg)
+        if ts is None:
+            continue
+        key = msg["timestamp"][:10]
+        day = days.get(key)
+        if day is None:
+            day = days[key] = _new_day()
+        touched.add(key)
+        day["messages"] += 1
+        if msg["type"] == "user" and not is_system_noise(msg["content"]):
+            day["user_messages"] += 1
+        if msg.get("session_id"):
+            day["sessions"].add(msg["session_id"])
+        windows = day["windows"]
+        if windows and windows[-1][0] <= ts <= windows[-1][1] + gap:
+            windows[-1][1] = max(windows[-1][1], ts)
+        else:
+            windows.append([ts, ts])
+        activity = message_activity(msg)
+        if activity:
+            _add_activities(day["activities"], [(ts, activity)])
+    for key in touched:
+        days[key]["windows"] = _merge_windows(days[key]["windows"], gap)
+    return days
+
+
+def merge_days(days: dict[str, dict], other: dict[str, dict]) -> dict[str, dict]:
+    """Combine per-day summaries of different sessions into days."""
+    gap = timedelta(minutes=ROLLUP_GAP_MINUTES)
+    for key, summary in other.items():
+        day = days.setdefault(key, _new_day())
+        day["messages"] += summary["messages"]
+        day["user_messages"] += summary["user_messages"]
+        day["sessions"] |= summary["sessions"]
+        day["windows"] = _merge_windows(day["windows"] + summary["windows"], gap)
+        _add_activities(day["activities"], summary["activities"])
+    return days
+
+
+def generate_activity_timeline(days: dict[str, dict], project_label: str | None = None) -> str:
+    """Render per-day summaries (from summarise_days or the index rollups)."""
+    if not days:
+        return "No activity to display."
+
+    lines = []
+    w = TIMELINE_WIDTH
+    dates = sorted(days)
+    date_range = f"{dates[0]} - {dates[-1]}" if len(dates) > 1 else dates[0]
+
+    lines.append(f"╔{'═' * w}╗")
+    title = "ACTIVITY TIMELINE"
+    if project_label:
+        title = f"{project_label} | {title}"
+    lines.append(f"║{title:^{w}}║")
+    lines.append(f"║{date_range:^{w}}║")
+    lines.append(f"╠{'═' * w}╣")
+    lines.append("")
+
+    for date_str in dates:
+        day = days[date_str]
+        try:
+            date_label = datetime.fromisoformat(date_str).strftime("%b %d %Y")
+        except ValueError:
+            date_label = date_str
+        sessions = len(day["sessions"])
+        summary = (
+            f" {day['messages']} msgs, {day['user_messages']} from user, "
+            f"{sessions} session{'s' if sessions != 1 else ''} "
+        )
+        lines.append(f"  {date_label}  ●{summary:━^{w - 16}}●")
+        for start, end in day["windows"]:
+            minutes = (end - start).total_seconds() / 60
+            lines.append(f"  {start.strftime('%H:%M')}        │ {minutes:.0f}m active")
+        for _, activity in day["activities"][:4]:
+            truncated = activity[: w - 19]
+            if len(activity) > w - 19:
+                truncated += "..."
+            lines.append(f"               │ • {truncated}")
+        lines.append(f"               └{'─' * (w - 16)}")
+        lines.append("")
+
+    lines.append(f"╚{'═' * w}╝")
+    return "\n".join(lines)
+
+
+# ── JSON Lines Output ────────────────────────────────────────
+
+JSONL_QUEUE = 1024  # records in flight between producer and writer thread
+COMPRESS_SUFFIX = {None: "", "gzip": ".gz", "zstd": ".zst"}
+_CLOSE = object()
+
+
+def _json_line(record: dict) -> bytes:
+    if orjson is None:
+        return json.dumps(record, ensure_ascii=False).encode() + b"\n"
+    return orjson.dumps(record) + b"\n"
+
+
+def _open_compressed(path: Path, compress: str | None):
+    if compress == "gzip":
+        return gzip.open(path, "wb", compresslevel=6)
+    if compress == "zstd":
+        import zstandard
+
+        return zstandard.ZstdCompressor(level=3).stream_writer(open(path, "wb"), closefd=True)
+    return open(path, "wb")
+
+
+class JsonlWriter:
+    """Writes records as JSON Lines from a background thread.
+
+    put() hands a record over a bounded queue, so the search keeps reading
+    while earlier records are encoded, compressed and written, and at most
+    JSONL_QUEUE records are held in memory. compress is None, "gzip" or
+    "zstd" (needs zstandard); the suffix is appended to path.
+    """
+
+    def __init__(self, path: Path, compress: str | None = None):
+        self.path = path.with_name(path.name + COMPRESS_SUFFIX[compress])
+        self.count = 0
+        self._file = _open_compressed(self.path, compress)
+        self._queue: queue.Queue = queue.Queue(maxsize=JSONL_QUEUE)
+        self._error: BaseException | None = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            while (record := self._queue.get()) is not _CLOSE:
+                if self._error is None:
+                    try:
+                        self._file.write(_json_line(record))
+                    except (OSError, TypeError, ValueError) as e:
+                        # Keep draining so put() never blocks on a dead writer
+                        self._error = e
+        finally:
+            self._file.close()
+
+    def put(self, record: dict):
+        """Queue a record; it must not be modified afterwards."""
+        if self._error is not None:
+            raise self._error
+        self._queue.put(record)
+        self.count += 1
+
+    def close(self):
+        self._queue.put(_CLOSE)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        try:
+            self.close()
+        except (OSError, TypeError, ValueError):
+            # Do not mask the exception that ended the with block
+            if exc_type is None:
+                raise
+
+
+# ── Subcommand: search ───────────────────────────────────────
+
+def _match_summaries(matches: list[dict], by_score: bool = False) -> list[dict]:
+    """Compact match records for search_index output."""
+    summaries = [
+        {
+            "timestamp": m["timestamp"],
+            "type": m["type"],
+            "session_id": m["session_id"],
+            "preview": m["content"][:100].replace("\n", " "),
+            **({"score": m["score"]} if "score" in m else {}),
+            **({"question": m["question"], "answer": m["answer"]} if "question" in m else {}),
+        }
+        for m in matches
+    ]
+    if by_score:
+        summaries.sort(key=lambda m: m["score"], reverse=True)
+    return summaries
+
+
+def cmd_search(args):
+    query = " ".join(args.query)
+    if args.socket:
+        request = {
             "query": query,
-            "match_count": len(matches),
-            "window_count": len(windows),
-            "context_messages": len(context_messages),
-            "windows": [
-                {
-                    "start": w[0].isoformat(),
-                    "end": w[1].isoformat(),
-                    "duration_minutes": (w[1] - w[0]).total_seconds() / 60,
-                }
-                for w in windows
-            ],
-            "matches_data": matches,
-            "context_data": context_messages,
+            "project": None if args.all_projects else args.project,
+            # Resolved here: the daemon runs in its own working directory
+            "folder": str(Path(args.folder).resolve()) if args.folder and not args.all_projects else None,
+            "since": args.since,
+            "include_agents": args.include_agents,
+            "ranked": args.ranked,
+            "semantic": args.semantic,
+            "dialogs": args.dialogs,
+            "model": args.model,
+            "limit": args.limit or 50,
         }
-        all_results.append(result)
+        try:
+            print(json.dumps(query_daemon(Path(args.socket), request), indent=2))
+        except OSError as e:
+            print(f"Error: no watch daemon on {args.socket} ({e})")
+            sys.exit(1)
+        return
+
+    output_dir = Path(args.output) if args.output else None
+    msg_index = open_index(args)
+    projects = resolve_projects(args, msg_index)
+    if not projects:
+        print(f"Error: No projects found for scope")
+        sys.exit(1)
+    if args.ranked and (msg_index is None or not msg_index.has_fts):
+        print("Error: --ranked needs the persistent index with SQLite FTS5 (drop --no-index)")
+        sys.exit(1)
+    if args.dialogs and (args.ranked or args.semantic):
+        print("Error: --dialogs works with substring search only")
+        sys.exit(1)
+    if args.semantic and msg_index is None:
+        print("Error: --semantic needs the persistent index (drop --no-index)")
+        sys.exit(1)
+    if args.compress and args.format != "jsonl":
+        print("Error: --compress needs --format jsonl")
+        sys.exit(1)
+    if args.compress == "zstd" and importlib.util.find_spec("zstandard") is None:
+        print("Error: --compress zstd needs zstandard (pip install zstandard)")
+        sys.exit(1)
+    all_results = []
+
+    # JSON Lines output streams each project's records as soon as they exist;
+    # the stack stops the writer threads and closes the files on any exit
+    index_writer = ctx_writer = None
+    with ExitStack() as writers:
+        if output_dir and args.format == "jsonl":
+            output_dir.mkdir(parents=True, exist_ok=True)
+            index_writer = writers.enter_context(
+                JsonlWriter(output_dir / "search_index.jsonl", args.compress)
+            )
+            ctx_writer = writers.enter_context(
+                JsonlWriter(output_dir / "context_messages.jsonl", args.compress)
+            )
+
+        for proj, session_files, matches in iter_project_matches(projects, query, args, msg_index):
+            if not matches:
+                continue
+            matches.sort(key=lambda m: m.get("timestamp", ""))
+
+            # Pass 2: read only the messages that fall inside match windows
+            windows = build_time_windows(matches, args.margin, args.gap)
+            context_messages = collect_window_messages(session_files, windows, msg_index, args.jobs)
+
+            result = {
+                "project": proj["project_path"],
+                "query": query,
+                "match_count": len(matches),
+                "window_count": len(windows),
+                "context_messages": len(context_messages),
+                "windows": [
+                    {
+                        "start": w[0].isoformat(),
+                        "end": w[1].isoformat(),
+                        "duration_minutes": (w[1] - w[0]).total_seconds() / 60,
+                    }
+                    for w in windows
+                ],
+                "matches_data": matches,
+                "context_data": context_messages,
+            }
+            if index_writer is not None:
+                index_writer.put({
+                    **{k: v for k, v in result.items() if k not in ("matches_data", "context_data")},
+                    "matches": _match_summaries(matches, args.ranked or args.semantic),
+                })
+                context_messages.sort(key=lambda m: m.get("timestamp", ""))
+                for m in context_messages:
+                    # Strip cache keys in place rather than copying each message
+                    for key in [k for k in m if k.startswith("_")]:
+                        del m[key]
+                    m["project"] = proj["project_path"]
+                    ctx_writer.put(m)
+                del result["context_data"]
+                if not args.timeline:
+                    del result["matches_data"]
+            all_results.append(result)
 
     if not all_results:
         print()
@@ -550,22 +2211,17 @@ def cmd_search(args):
     print()
 
     # Save output
-    if output_dir:
+    if index_writer is not None:
+        print(f"Results saved to: {index_writer.path} ({index_writer.count} projects), "
+              f"{ctx_writer.path} ({ctx_writer.count} context messages)")
+    elif output_dir:
         output_dir.mkdir(parents=True, exist_ok=True)
 
         # Build serialisable results (strip raw data)
         serialisable = []
         for r in all_results:
             sr = {k: v for k, v in r.items() if k not in ("matches_data", "context_data")}
-            sr["matches"] = [
-                {
-                    "timestamp": m["timestamp"],
-                    "type": m["type"],
-                    "session_id": m["session_id"],
-                    "preview": m["content"][:100].replace("\n", " "),
-                }
-                for m in r["matches_data"]
-            ]
+            sr["matches"] = _match_summaries(r["matches_data"], args.ranked or args.semantic)
             serialisable.append(sr)
 
         with open(output_dir / "search_index.json", "w") as f:
@@ -575,7 +2231,7 @@ def cmd_search(args):
         all_ctx = []
         for r in all_results:
             for m in r["context_data"]:
-                m_copy = {k: v for k, v in m.items()}
+                m_copy = public_fields(m)
                 m_copy["project"] = r["project"]
                 all_ctx.append(m_copy)
         all_ctx.sort(key=lambda m: m.get("timestamp", ""))
@@ -590,15 +2246,7 @@ def cmd_search(args):
         timeline_parts = []
         for r in all_results:
             proj_label = Path(r["project"]).name if len(all_results) > 1 else None
-            match_previews = [
-                {
-                    "timestamp": m["timestamp"],
-                    "type": m["type"],
-                    "preview": m["content"][:100].replace("\n", " "),
-                }
-                for m in r["matches_data"]
-            ]
-            tl = generate_timeline(match_previews, r["windows"], query, proj_label)
+            tl = generate_timeline(r["matches_data"], r["windows"], query, proj_label)
             timeline_parts.append(tl)
 
         timeline = "\n\n".join(timeline_parts)
@@ -628,21 +2276,26 @@ def cmd_search(args):
 # ── Subcommand: scan ─────────────────────────────────────────
 
 def cmd_scan(args):
-    projects = resolve_projects(args)
+    msg_index = open_index(args)
+    projects = resolve_projects(args, msg_index)
     if not projects:
         print("Error: No projects found for scope")
         sys.exit(1)
 
     all_stats = []
-    for proj in projects:
-        all_messages = []
-        session_count = 0
-        for sf in iter_sessions_for_project(proj, getattr(args, "since", None)):
-            session_count += 1
-            all_messages.extend(extract_messages(sf))
-
+    timelines = []
+    for proj, session_count, all_messages in iter_project_messages(projects, args, msg_index):
         all_messages.sort(key=lambda m: m.get("timestamp", ""))
         user_messages = filter_user_messages(all_messages)
+        if args.timeline:
+            if msg_index is not None:
+                # iter_project_messages refreshed these files, so rollups are current
+                files = iter_sessions_for_project(proj, args.since, args.include_agents)
+                days = msg_index.activity_days(list(files))
+            else:
+                days = summarise_days(all_messages)
+            label = Path(proj["project_path"]).name if len(projects) > 1 else None
+            timelines.append(generate_activity_timeline(days, label))
 
         stats = {
             "project": proj["project_path"],
@@ -695,25 +2348,148 @@ def cmd_scan(args):
         print(box_bottom())
         print()
 
+    for timeline in timelines:
+        print(timeline)
+        print()
+
     print(json.dumps(all_stats if len(all_stats) > 1 else all_stats[0], indent=2))
 
 
+# ── Columnar Export ──────────────────────────────────────────
+
+COLUMNAR_MAGIC = b"SSCOL1\n"
+COLUMNAR_INTERNED = ("type", "session_id", "source_file")
+COLUMNAR_STRINGS = ("uuid", "timestamp", "content")
+COLUMNAR_NUMBERS = {"source_line": "I", "is_speak_mcp": "B"}
+
+
+def write_columnar(path: Path, messages: list[dict]):
+    """Write messages as a compact columnar file.
+
+    Layout: magic, u32 header length, JSON header, then raw little-endian
+    column blobs. Repeated strings (type, session_id, source_file) become a
+    string table plus uint32 ids; free text is one UTF-8 blob plus uint64
+    end offsets, so readers can slice single messages without parsing.
+    """
+    header: dict = {"count": len(messages), "tables": {}, "columns": {}}
+    blobs: list[bytes] = []
+    pos = 0
+
+    def add_column(name: str, data: array | bytes, dtype: str):
+        nonlocal pos
+        if isinstance(data, array):
+            if sys.byteorder == "big":
+                data.byteswap()
+            data = data.tobytes()
+        header["columns"][name] = {"dtype": dtype, "offset": pos, "length": len(data)}
+        blobs.append(data)
+        pos += len(data)
+
+    for name in COLUMNAR_INTERNED:
+        table: dict[str, int] = {}
+        ids = array("I", (table.setdefault(m[name], len(table)) for m in messages))
+        header["tables"][name] = list(table)
+        add_column(name, ids, "I")
+    for name in COLUMNAR_STRINGS:
+        encoded = [m[name].encode("utf-8") for m in messages]
+        ends = array("Q", accumulate(len(b) for b in encoded))
+        add_column(f"{name}.ends", ends, "Q")
+        add_column(name, b"".join(encoded), "utf-8")
+    for name, dtype in COLUMNAR_NUMBERS.items():
+        add_column(name, array(dtype, (int(m.get(name, 0)) for m in messages)), dtype)
+
+    header_bytes = json.dumps(header, separators=(",", ":")).encode()
+    with open(path, "wb") as f:
+        f.write(COLUMNAR_MAGIC)
+        f.write(struct.pack("<I", len(header_bytes)))
+        f.write(header_bytes)
+        for blob in blobs:
+            f.write(blob)
+
+
+class ColumnarMessages:
+    """Memory-mapped reader for files written by write_columnar().
+
+    Numeric and id columns load as compact arrays; text stays in the map
+    and is decoded per message on access.
+    """
+
+    def __init__(self, path: Path):
+        self._file = open(path, "rb")
+        self._buf = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._buf[:len(COLUMNAR_MAGIC)] != COLUMNAR_MAGIC:
+            raise ValueError(f"{path} is not a session-search columnar file")
+        (header_len,) = struct.unpack_from("<I", self._buf, len(COLUMNAR_MAGIC))
+        data_start = len(COLUMNAR_MAGIC) + 4 + header_len
+        header = json.loads(self._buf[data_start - header_len:data_start])
+        self.count = header["count"]
+        self.tables: dict[str, list[str]] = header["tables"]
+        self._spans = {
+            name: (data_start + col["offset"], data_start + col["offset"] + col["length"])
+            for name, col in header["columns"].items()
+        }
+        self.arrays: dict[str, array] = {}
+        for name, col in header["columns"].items():
+            if col["dtype"] != "utf-8":
+                start, end = self._spans[name]
+                arr = array(col["dtype"])
+                arr.frombytes(self._buf[start:end])
+                if sys.byteorder == "big":
+                    arr.byteswap()
+                self.arrays[name] = arr
+
+    def __len__(self) -> int:
+        return self.count
+
+    def text(self, name: str, i: int) -> str:
+        ends = self.arrays[f"{name}.ends"]
+        base = self._spans[name][0]
+        start = ends[i - 1] if i else 0
+        return self._buf[base + start:base + ends[i]].decode("utf-8")
+
+    def __getitem__(self, i: int) -> dict:
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        msg = {name: self.tables[name][self.arrays[name][i]] for name in COLUMNAR_INTERNED}
+        for name in COLUMNAR_STRINGS:
+            msg[name] = self.text(name, i)
+        msg["source_line"] = self.arrays["source_line"][i]
+        if self.arrays["is_speak_mcp"][i]:
+            msg["is_speak_mcp"] = True
+        return msg
+
+    def close(self):
+        self._buf.close()
+        self._file.close()
+
+
+def write_parquet(path: Path, messages: list[dict]):
+    """Write messages as Parquet with dictionary-encoded repeated strings (needs pyarrow)."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    columns = {name: [m[name] for m in messages] for name in COLUMNAR_INTERNED + COLUMNAR_STRINGS}
+    columns["source_line"] = [m["source_line"] for m in messages]
+    columns["is_speak_mcp"] = [bool(m.get("is_speak_mcp")) for m in messages]
+    pq.write_table(pa.table(columns), path, use_dictionary=list(COLUMNAR_INTERNED))
+
+
 # ── Subcommand: extract ──────────────────────────────────────
 
 def cmd_extract(args):
-    projects = resolve_projects(args)
+    if args.format == "parquet" and importlib.util.find_spec("pyarrow") is None:
+        print("Error: --format parquet needs pyarrow (pip install pyarrow)")
+        sys.exit(1)
+    output_dir = Path(args.output)
+    msg_index = open_index(args)
+    projects = resolve_projects(args, msg_index)
     if not projects:
         print("Error: No projects found for scope")
         sys.exit(1)
 
-    output_dir = Path(args.output)
     all_results = []
 
-    for proj in projects:
-        all_messages = []
-        for sf in iter_sessions_for_project(proj, getattr(args, "since", None)):
-            all_messages.extend(extract_messages(sf))
-
+    for proj, _, all_messages in iter_project_messages(projects, args, msg_index):
         all_messages.sort(key=lambda m: m.get("timestamp", ""), reverse=True)
         user_messages = filter_user_messages(all_messages)[: args.limit]
         user_messages.reverse()
@@ -730,36 +2506,45 @@ def cmd_extract(args):
 
         proj_output.mkdir(parents=True, exist_ok=True)
 
-        index = [
-            {
-                "timestamp": m["timestamp"],
-                "session_id": m["session_id"],
-                "uuid": m["uuid"],
-                "source_file": m["source_file"],
-                "source_line": m["source_line"],
-                "preview": m["content"][:100].replace("\n", " "),
-                "char_count": len(m["content"]),
-            }
-            for m in user_messages
-        ]
-
-        with open(proj_output / "message_index.json", "w") as f:
-            json.dump(index, f, indent=2)
-        with open(proj_output / "user_messages.json", "w") as f:
-            json.dump(user_messages, f, indent=2)
-
         result = {
             "project": proj["project_path"],
             "message_count": len(user_messages),
             "estimated_tokens": estimate_tokens(user_messages),
-            "index_file": str(proj_output / "message_index.json"),
-            "messages_file": str(proj_output / "user_messages.json"),
+        }
+        if args.format == "json":
+            index = [
+                {
+                    "timestamp": m["timestamp"],
+                    "session_id": m["session_id"],
+                    "uuid": m["uuid"],
+                    "source_file": m["source_file"],
+                    "source_line": m["source_line"],
+                    "preview": m["content"][:100].replace("\n", " "),
+                    "char_count": len(m["content"]),
+                }
+                for m in user_messages
+            ]
+
+            with open(proj_output / "message_index.json", "w") as f:
+                json.dump(index, f, indent=2)
+            with open(proj_output / "user_messages.json", "w") as f:
+                json.dump(user_messages, f, indent=2)
+            result["index_file"] = str(proj_output / "message_index.json")
+            result["messages_file"] = str(proj_output / "user_messages.json")
+        elif args.format == "columnar":
+            write_columnar(proj_output / "user_messages.ssc", user_messages)
+            result["messages_file"] = str(proj_output / "user_messages.ssc")
+        else:
+            write_parquet(proj_output / "user_messages.parquet", user_messages)
+            result["messages_file"] = str(proj_output / "user_messages.parquet")
+
+        result.update({
             "time_range": (
                 f"{user_messages[0]['timestamp'][:10]} to {user_messages[-1]['timestamp'][:10]}"
                 if user_messages
                 else None
             ),
-        }
+        })
         all_results.append(result)
 
     if not all_results:
@@ -784,6 +2569,268 @@ def cmd_extract(args):
     print(json.dumps(all_results if len(all_results) > 1 else all_results[0], indent=2))
 
 
+# ── Subcommand: watch ────────────────────────────────────────
+
+def iter_all_session_files() -> Iterator[Path]:
+    """Session files of every project directory, skipping archives."""
+    if not PROJECTS_DIR.is_dir():
+        return
+    for project_dir in sorted(PROJECTS_DIR.iterdir()):
+        if project_dir.is_dir() and project_dir.name != "_archive":
+            yield from iter_project_sessions(project_dir)
+
+
+def _is_session_name(name: str) -> bool:
+    return name.endswith(".jsonl") and not name.startswith("agent-")
+
+
+class InotifyWatcher:
+    """Report appended session files via Linux inotify (through ctypes)."""
+
+    IN_MODIFY = 0x002
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_ISDIR = 0x40000000
+    EVENT = struct.Struct("iIII")
+
+    def __init__(self, root: Path):
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.root = root
+        self.dirs: dict[int, Path] = {}
+        self._watch(root)
+        for d in root.iterdir():
+            if d.is_dir() and d.name != "_archive":
+                self._watch(d)
+
+    def _watch(self, directory: Path):
+        mask = self.IN_MODIFY | self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), mask)
+        if wd >= 0:
+            self.dirs[wd] = directory
+
+    def wait(self, timeout: float) -> set[Path]:
+        """Block up to timeout seconds; return session files that changed."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        changed: set[Path] = set()
+        data = os.read(self.fd, 64 * 1024)
+        pos = 0
+        while pos + self.EVENT.size <= len(data):
+            wd, mask, _, name_len = self.EVENT.unpack_from(data, pos)
+            pos += self.EVENT.size
+            name = os.fsdecode(data[pos:pos + name_len].rstrip(b"\0"))
+            pos += name_len
+            directory = self.dirs.get(wd)
+            if directory is None or not name:
+                continue
+            path = directory / name
+            if mask & self.IN_ISDIR:
+                if directory == self.root and name != "_archive":
+                    self._watch(path)
+                    changed.update(iter_project_sessions(path))
+            elif directory != self.root and _is_session_name(name):
+                changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Stat-based fallback for platforms without inotify."""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.seen: dict[Path, tuple[int, int]] = {}
+        self._scan()
+
+    def _scan(self) -> set[Path]:
+        changed = set()
+        for sf in iter_all_session_files():
+            try:
+                st = sf.stat()
+            except OSError:
+                continue
+            key = (st.st_size, st.st_mtime_ns)
+            if self.seen.get(sf) != key:
+                self.seen[sf] = key
+                changed.add(sf)
+        return changed
+
+    def wait(self, timeout: float) -> set[Path]:
+        time.sleep(timeout)
+        return self._scan()
+
+    def close(self):
+        pass
+
+
+def make_watcher(root: Path, poll: bool = False) -> InotifyWatcher | PollingWatcher:
+    if not poll:
+        try:
+            return InotifyWatcher(root)
+        except (AttributeError, OSError):
+            pass  # no inotify (macOS) or watch limit reached
+    return PollingWatcher(root)
+
+
+class _QueryHandler(socketserver.StreamRequestHandler):
+    """One JSON request line in, one JSON response line out."""
+
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return  # a liveness probe connects and hangs up
+        try:
+            request = json.loads(line)
+            response = self.server.answer(request)
+        except (ValueError, KeyError, TypeError, sqlite3.Error) as e:
+            response = {"error": str(e)}
+        self.wfile.write(json.dumps(response).encode() + b"\n")
+
+
+class QueryServer(socketserver.UnixStreamServer):
+    """Answers searches from the hot index over a local Unix socket.
+
+    Request: {"query": str, "project": path, "folder": path, "since": int,
+    "include_agents": bool, "ranked": bool, "semantic": bool, "dialogs": bool,
+    "model": str, "limit": int} where all but query are optional and scope or
+    shape the search like the CLI flags. folder must be absolute, since the
+    daemon's working directory is not the client's.
+    """
+
+    def __init__(self, socket_path: Path):
+        super().__init__(str(socket_path), _QueryHandler)
+        self.index: MessageIndex | None = None
+        self.vectors: dict[str | None, VectorIndex] = {}
+
+    def serve_forever(self, poll_interval: float = 0.5):
+        # SQLite connections belong to the thread that opened them
+        self.index = MessageIndex()
+        super().serve_forever(poll_interval)
+
+    def answer(self, request: dict) -> dict:
+        try:
+            return self._answer(request)
+        finally:
+            # The temp scope table opens an implicit transaction; ending it
+            # lets the next request see lines the watcher indexed since
+            self.index.conn.commit()
+
+    def _answer(self, request: dict) -> dict:
+        query = request["query"]
+        limit = request.get("limit", 50)
+        # Same scope resolution as the CLI: --all-projects, then --folder, then -p
+        scope = argparse.Namespace(
+            all_projects=not (request.get("folder") or request.get("project")),
+            folder=request.get("folder"),
+            project=request.get("project"),
+            since=request.get("since"),
+        )
+        session_files = [
+            sf for proj in resolve_projects(scope, self.index)
+            for sf in iter_sessions_for_project(
+                proj, scope.since, request.get("include_agents", False),
+            )
+        ]
+        # The watcher skips agent-* files; unchanged files cost one stat
+        self.index.refresh_many(session_files)
+        if request.get("semantic"):
+            model = request.get("model")
+            if model not in self.vectors:
+                self.vectors[model] = VectorIndex(self.index, make_embedder(model))
+            self.vectors[model].update(session_files)
+            matches = self.vectors[model].search(session_files, query, limit)
+        elif request.get("ranked"):
+            matches = self.index.search_ranked(session_files, query, limit)
+        else:
+            matches = self.index.search_text(query, session_files, limit, request.get("dialogs", False))
+        return {"query": query, "count": len(matches), "matches": matches}
+
+
+def query_daemon(socket_path: Path, request: dict) -> dict:
+    """Send one request to a running `watch --socket` daemon."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(str(socket_path))
+        sock.sendall(json.dumps(request).encode() + b"\n")
+        with sock.makefile("rb") as f:
+            return json.loads(f.readline())
+
+
+def _clear_stale_socket(socket_path: Path):
+    """Remove a socket left by a daemon that died; refuse a live one or a non-socket."""
+    try:
+        if not stat.S_ISSOCK(socket_path.lstat().st_mode):
+            print(f"Error: {socket_path} exists and is not a socket")
+            sys.exit(1)
+    except FileNotFoundError:
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(str(socket_path))
+        except OSError:
+            socket_path.unlink(missing_ok=True)
+            return
+    print(f"Error: a daemon is already serving {socket_path}")
+    sys.exit(1)
+
+
+def _exit_on_sigterm(signum, frame):
+    # Unwinds like Ctrl-C so cmd_watch's cleanup runs
+    sys.exit(128 + signum)
+
+
+def cmd_watch(args):
+    msg_index = open_index(args)
+    if msg_index is None:
+        print("Error: watch keeps the persistent index hot and cannot run with --no-index")
+        sys.exit(1)
+    if not PROJECTS_DIR.is_dir():
+        print(f"Error: {PROJECTS_DIR} not found")
+        sys.exit(1)
+
+    watcher = make_watcher(PROJECTS_DIR, poll=args.poll)
+    mode = "inotify" if isinstance(watcher, InotifyWatcher) else f"polling every {args.interval}s"
+    initial = list(iter_all_session_files())
+    new_count = msg_index.refresh_many(initial, args.jobs)
+    print(f"[watch] {PROJECTS_DIR} ({mode}): {len(initial)} sessions, {new_count} new messages indexed",
+          flush=True)
+
+    server = None
+    if args.socket:
+        socket_path = Path(args.socket)
+        _clear_stale_socket(socket_path)
+        server = QueryServer(socket_path)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print(f"[watch] serving queries on {socket_path}", flush=True)
+
+    previous_handler = signal.signal(signal.SIGTERM, _exit_on_sigterm)
+    try:
+        while True:
+            changed = watcher.wait(args.interval)
+            if not changed:
+                continue
+            new_count = msg_index.refresh_many(sorted(changed))
+            if new_count:
+                stamp = datetime.now().strftime("%H:%M:%S")
+                print(f"[watch] {stamp} +{new_count} messages from {len(changed)} file(s)", flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        signal.signal(signal.SIGTERM, previous_handler)
+        watcher.close()
+        if server:
+            server.shutdown()
+            server.server_close()
+            Path(args.socket).unlink(missing_ok=True)
+        msg_index.close()
+
+
 # ── CLI ──────────────────────────────────────────────────────
 
 def add_scope_args(parser: argparse.ArgumentParser):
@@ -803,10 +2850,22 @@ def add_scope_args(parser: argparse.ArgumentParser):
         "--since", type=int, default=None,
         help="Only sessions modified in past N minutes",
     )
+    parser.add_argument(
+        "--include-agents", action="store_true",
+        help="Also read agent-* sub-session files",
+    )
     parser.add_argument(
         "-o", "--output", type=str, default=".session-search",
         help="Output directory (default: .session-search)",
     )
+    parser.add_argument(
+        "--no-index", action="store_true",
+        help="Parse session files directly instead of using the persistent index",
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=1,
+        help="Parse session files in N processes (0 = all cores, default: 1)",
+    )
 
 
 def main():
@@ -821,17 +2880,75 @@ def main():
     sp_search.add_argument("-m", "--margin", type=int, default=5, help="Context margin minutes")
     sp_search.add_argument("-g", "--gap", type=int, default=10, help="Merge gap minutes")
     sp_search.add_argument("-t", "--timeline", action="store_true", help="Generate timeline")
+    sp_search.add_argument(
+        "-n", "--limit", type=int, default=None,
+        help="Stop reading after N matches across all projects",
+    )
+    mode = sp_search.add_mutually_exclusive_group()
+    mode.add_argument(
+        "-r", "--ranked", action="store_true",
+        help="Full-text search (FTS5 syntax: terms, \"phrases\", prefix*) ranked by relevance",
+    )
+    mode.add_argument(
+        "--semantic", action="store_true",
+        help=f"Nearest messages by meaning (embedding search, default top {SEMANTIC_LIMIT})",
+    )
+    sp_search.add_argument(
+        "-d", "--dialogs", action="store_true",
+        help="Only match speak MCP question/answer dialogs",
+    )
+    sp_search.add_argument(
+        "--model", type=str, default=None,
+        help="sentence-transformers model for --semantic (default: hashed n-grams, no deps)",
+    )
+    sp_search.add_argument(
+        "--socket", type=str, default=None,
+        help="Ask a running `watch --socket` daemon instead of reading history",
+    )
+    sp_search.add_argument(
+        "-f", "--format", choices=("json", "jsonl"), default="json",
+        help="Output files as json (default) or streamed JSON Lines",
+    )
+    sp_search.add_argument(
+        "-z", "--compress", choices=("gzip", "zstd"), default=None,
+        help="Compress jsonl output (zstd needs zstandard)",
+    )
     add_scope_args(sp_search)
 
     # scan
     sp_scan = sub.add_parser("scan", help="Scan project history stats")
+    sp_scan.add_argument(
+        "-t", "--timeline", action="store_true",
+        help="Print a per-day activity timeline of the whole history",
+    )
     add_scope_args(sp_scan)
 
     # extract
     sp_extract = sub.add_parser("extract", help="Extract recent user messages")
     sp_extract.add_argument("-n", "--limit", type=int, default=100, help="Message count limit")
+    sp_extract.add_argument(
+        "-f", "--format", choices=("json", "columnar", "parquet"), default="json",
+        help="json (default), columnar (.ssc, stdlib) or parquet (needs pyarrow)",
+    )
     add_scope_args(sp_extract)
 
+    # watch
+    sp_watch = sub.add_parser("watch", help="Tail session files and keep the index hot")
+    sp_watch.add_argument(
+        "--socket", type=str, default=None,
+        help=f"Serve queries on this Unix socket (e.g. {INDEX_DB.parent / 'watch.sock'})",
+    )
+    sp_watch.add_argument("--poll", action="store_true", help="Poll instead of using inotify")
+    sp_watch.add_argument(
+        "--interval", type=float, default=2.0,
+        help="Seconds between polls / idle wakeups (default: 2)",
+    )
+    sp_watch.add_argument(
+        "-j", "--jobs", type=int, default=1,
+        help="Processes for the initial catch-up indexing (0 = all cores)",
+    )
+    sp_watch.set_defaults(no_index=False)
+
     args = parser.parse_args()
 
     if args.command == "search":
@@ -840,6 +2957,8 @@ def main():
         cmd_scan(args)
     elif args.command == "extract":
         cmd_extract(args)
+    elif args.command == "watch":
+        cmd_watch(args)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,91 @@
+"""Tests for session_search.py (run with: python -m pytest session-search/scripts)."""
+
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import session_search as ss
+
+
+def _write_session(path, texts):
+    lines = [
+        json.dumps({
+            "type": "user",
+            "sessionId": path.stem,
+            "uuid": f"u{i}",
+            "timestamp": f"2025-01-01T00:00:{i:02d}Z",
+            "message": {"content": text},
+        })
+        for i, text in enumerate(texts)
+    ]
+    path.write_text("\n".join(lines) + "\n")
+
+
+@pytest.mark.parametrize("ranked", [False, True])
+def test_symlinked_session_matches_in_every_project(tmp_path, ranked):
+    real_dir, link_dir = tmp_path / "-work-a", tmp_path / "-work-b"
+    real_dir.mkdir()
+    link_dir.mkdir()
+    session = real_dir / "s1.jsonl"
+    _write_session(session, ["fix the widget", "unrelated", "widget again"])
+    (link_dir / "s1.jsonl").symlink_to(session)
+
+    projects = [
+        {"project_dir": real_dir, "session_entries": None},
+        {"project_dir": link_dir, "session_entries": None},
+    ]
+    args = SimpleNamespace(
+        ranked=ranked, semantic=False, since=None, include_agents=False,
+        jobs=1, limit=None, dialogs=False,
+    )
+    index = ss.MessageIndex(tmp_path / "index.db")
+    results = list(ss.iter_project_matches(projects, "widget", args, index))
+
+    assert [len(matches) for _, _, matches in results] == [2, 2]
+    for proj, files, matches in results:
+        assert {m["source_file"] for m in matches} == {str(f) for f in files}
+
+
+def test_query_server_sees_lines_indexed_by_another_connection(tmp_path, monkeypatch):
+    projects_dir = tmp_path / "projects"
+    project_dir = projects_dir / "-work-a"
+    project_dir.mkdir(parents=True)
+    monkeypatch.setattr(ss, "PROJECTS_DIR", projects_dir)
+    session = project_dir / "s1.jsonl"
+    _write_session(session, ["fix the widget"])
+
+    db = tmp_path / "index.db"
+    watcher_index = ss.MessageIndex(db)
+    watcher_index.refresh(session)
+    server = ss.QueryServer(tmp_path / "q.sock")
+    try:
+        server.index = ss.MessageIndex(db)
+        request = {"query": "zebraquux", "project": "/work/a"}
+        assert server.answer(request)["count"] == 0
+
+        with open(session, "a") as f:
+            f.write(json.dumps({
+                "type": "user", "sessionId": "s1", "uuid": "u9",
+                "timestamp": "2025-01-01T00:01:00Z", "message": {"content": "zebraquux"},
+            }) + "\n")
+        watcher_index.refresh(session)
+
+        assert server.answer(request)["count"] == 1
+    finally:
+        server.server_close()
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("needle-phrase", 1),
+    ("a.b:c", 1),
+    ('"needle phrase"', 1),
+    ("needl*", 1),
+    ('"widget" needle', 0),
+])
+def test_ranked_query_treats_punctuated_tokens_as_text(tmp_path, query, expected):
+    session = tmp_path / "s1.jsonl"
+    _write_session(session, ["the needle-phrase lives here", "call a.b:c now", "widget"])
+    index = ss.MessageIndex(tmp_path / "index.db")
+    index.refresh(session)
+    assert len(index.search_ranked([session], query)) == expected